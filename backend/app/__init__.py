@@ -1,21 +1,56 @@
 """Application initialization"""
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.core.config import settings
+from app.core.middleware import StreamingAwareGZipMiddleware
+from app.core.utils import load_legal_sources
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize services on startup and clean up on shutdown"""
+    from app.api import routes
+    from app.services.answer_cache import SemanticAnswerCache
+    from app.services.assistant_service import AssistantService
+    
+    # Vector stores and the legal sources config are independent - load concurrently
+    assistant_service = AssistantService()
+    _, legal_sources = await asyncio.gather(
+        assistant_service.initialize(),
+        asyncio.to_thread(load_legal_sources, settings.LEGAL_SOURCES_CONFIG)
+    )
+    
+    app.state.assistant_service = assistant_service
+    app.state.legal_sources = legal_sources
+    app.state.legal_sources_payload = routes.build_legal_sources_payload(legal_sources)
+    app.state.answer_cache = SemanticAnswerCache(
+        embeddings=assistant_service.embeddings,
+        corpus_version=assistant_service.corpus_version
+    )
+    logger.info("Application started successfully!")
+    
+    yield
+    
+    logger.info("Application shutting down...")
+
+
 def create_application() -> FastAPI:
     """Create and configure the FastAPI application"""
     
     app = FastAPI(
         title=settings.APP_NAME,
         description=settings.APP_DESCRIPTION,
-        version=settings.VERSION
+        version=settings.VERSION,
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
     )
     
     # Configure CORS
@@ -27,23 +62,16 @@ def create_application() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Compress large JSON payloads (legal sources, agreements); SSE stays unbuffered
+    app.add_middleware(
+        StreamingAwareGZipMiddleware,
+        minimum_size=1024,
+        compresslevel=5,
+        excluded_paths=("/query-stream",)
+    )
+    
     # Register routes
     from app.api import routes
     app.include_router(routes.router)
     
-    # Startup event
-    @app.on_event("startup")
-    async def startup_event():
-        """Initialize services on startup"""
-        from app.services.assistant_service import AssistantService
-        app.state.assistant_service = AssistantService()
-        await app.state.assistant_service.initialize()
-        logger.info("Application started successfully!")
-    
-    # Shutdown event
-    @app.on_event("shutdown")
-    async def shutdown_event():
-        """Cleanup on shutdown"""
-        logger.info("Application shutting down...")
-    
     return app
@@ -1,7 +1,9 @@
 """API routes"""
 
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import StreamingResponse
+import asyncio
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from app.models.schemas import (
     QueryRequest,
     QueryResponse,
@@ -11,15 +13,43 @@ from app.models.schemas import (
     AgreementRequest,
     AgreementResponse
 )
-from app.core.config import settings
+from app.core.utils import json_dumps as _dumps, load_legal_sources
+from app.services.assistant_service import AssistantService
 import logging
-import json
+
+# Pre-encoded SSE framing for the streaming endpoint
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+_SSE_DONE = b"data: [DONE]\n\n"
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def get_ready_assistant(request: Request) -> AssistantService:
+    """Dependency returning the assistant service once it is ready"""
+    assistant_service = request.app.state.assistant_service
+    
+    if not assistant_service.is_ready():
+        raise HTTPException(
+            status_code=500,
+            detail="Legal assistant not initialized"
+        )
+    
+    return assistant_service
+
+
+def build_legal_sources_payload(sources: List[dict]) -> bytes:
+    """Serialize the legal sources response once so requests can reuse it"""
+    return _dumps(
+        LegalSourcesResponse(
+            sources=sources,
+            success=True
+        ).model_dump()
+    )
+
+
 @router.get("/", response_model=HealthResponse)
 async def health_check(request: Request):
     """Health check endpoint"""
@@ -31,34 +61,53 @@ async def health_check(request: Request):
     )
 
 
-@router.post("/query", response_model=QueryResponse)
-async def query_legal_assistant(query_request: QueryRequest, request: Request):
+# Hot POST routes build their JSON directly; response models are kept for docs only
+@router.post("/query", responses={200: {"model": QueryResponse}})
+async def query_legal_assistant(
+    query_request: QueryRequest,
+    request: Request,
+    assistant_service: AssistantService = Depends(get_ready_assistant)
+):
     """Query the legal assistant"""
     try:
-        assistant_service = request.app.state.assistant_service
-        
-        if not assistant_service.is_ready():
-            raise HTTPException(
-                status_code=500,
-                detail="Legal assistant not initialized"
-            )
-        
-        logger.info(f"Processing query: {query_request.question}")
+        logger.info("Processing query: %s", query_request.question)
+        
+        # Only standalone questions are cacheable - follow-ups depend on history
+        answer_cache = request.app.state.answer_cache
+        cacheable = not query_request.chat_history
+        embedding = None
+        
+        if cacheable:
+            cached, embedding = await answer_cache.lookup(query_request.question)
+            if cached is not None:
+                return ORJSONResponse({
+                    "question": query_request.question,
+                    "answer": cached["answer"],
+                    "sources": cached["sources"],
+                    "success": True
+                })
         
         result = await assistant_service.query(
             question=query_request.question,
             chat_history=query_request.chat_history
         )
         
-        return QueryResponse(
-            question=result["question"],
-            answer=result["answer"],
-            sources=result["sources"],
-            success=True
-        )
+        if cacheable:
+            await answer_cache.put(
+                query_request.question,
+                embedding,
+                {"answer": result["answer"], "sources": result["sources"]}
+            )
+        
+        return ORJSONResponse({
+            "question": result["question"],
+            "answer": result["answer"],
+            "sources": result["sources"],
+            "success": True
+        })
         
     except Exception as e:
-        logger.error(f"Error processing query: {str(e)}")
+        logger.error("Error processing query: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing query: {str(e)}"
@@ -66,37 +115,34 @@ async def query_legal_assistant(query_request: QueryRequest, request: Request):
 
 
 @router.post("/query-stream")
-async def query_legal_assistant_stream(query_request: QueryRequest, request: Request):
+async def query_legal_assistant_stream(
+    query_request: QueryRequest,
+    assistant_service: AssistantService = Depends(get_ready_assistant)
+):
     """Query the legal assistant with streaming response"""
     try:
-        assistant_service = request.app.state.assistant_service
-        
-        if not assistant_service.is_ready():
-            raise HTTPException(
-                status_code=500,
-                detail="Legal assistant not initialized"
-            )
-        
-        logger.info(f"Processing streaming query: {query_request.question}")
+        logger.debug("Processing streaming query: %s", query_request.question)
         
         async def generate():
             """Generate streaming response"""
+            join = b"".join
+            
+            # A single try around the whole stream keeps the per-chunk path minimal
             try:
-                # Stream the response
                 async for chunk in assistant_service.query_stream(
                     question=query_request.question,
                     chat_history=query_request.chat_history
                 ):
                     # Send each chunk as JSON
-                    yield f"data: {json.dumps(chunk)}\n\n"
+                    yield join((_SSE_PREFIX, _dumps(chunk), _SSE_SUFFIX))
                 
                 # Send completion signal
-                yield "data: [DONE]\n\n"
+                yield _SSE_DONE
                 
             except Exception as e:
-                logger.error(f"Error in streaming: {str(e)}")
+                logger.error("Error in streaming: %s", e)
                 error_data = {"error": str(e)}
-                yield f"data: {json.dumps(error_data)}\n\n"
+                yield join((_SSE_PREFIX, _dumps(error_data), _SSE_SUFFIX))
         
         return StreamingResponse(
             generate(),
@@ -109,14 +155,14 @@ async def query_legal_assistant_stream(query_request: QueryRequest, request: Req
         )
         
     except Exception as e:
-        logger.error(f"Error processing streaming query: {str(e)}")
+        logger.error("Error processing streaming query: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing query: {str(e)}"
         )
 
 
-@router.post("/reload-documents", response_model=ReloadResponse)
+@router.post("/reload-documents", responses={200: {"model": ReloadResponse}})
 async def reload_documents(request: Request):
     """Reload legal documents and rebuild vector store"""
     try:
@@ -124,42 +170,46 @@ async def reload_documents(request: Request):
         
         assistant_service = request.app.state.assistant_service
         await assistant_service.initialize(force_reload=True)
-        
-        return ReloadResponse(
-            message="Documents reloaded successfully",
-            success=True
+        request.app.state.answer_cache.clear(corpus_version=assistant_service.corpus_version)
+        request.app.state.legal_sources = await asyncio.to_thread(load_legal_sources)
+        request.app.state.legal_sources_payload = build_legal_sources_payload(
+            request.app.state.legal_sources
         )
         
+        return ORJSONResponse({
+            "message": "Documents reloaded successfully",
+            "success": True
+        })
+        
     except Exception as e:
-        logger.error(f"Error reloading documents: {str(e)}")
+        logger.error("Error reloading documents: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error reloading documents: {str(e)}"
         )
 
 
-@router.get("/legal-sources", response_model=LegalSourcesResponse)
-async def get_legal_sources():
+@router.get("/legal-sources", responses={200: {"model": LegalSourcesResponse}})
+async def get_legal_sources(request: Request):
     """Get list of configured legal sources"""
-    return LegalSourcesResponse(
-        sources=settings.LEGAL_SOURCES,
-        success=True
+    return Response(
+        content=request.app.state.legal_sources_payload,
+        media_type="application/json"
     )
 
 
-@router.post("/generate-agreement", response_model=AgreementResponse)
-async def generate_agreement(agreement_request: AgreementRequest, request: Request):
+@router.post("/generate-agreement", responses={200: {"model": AgreementResponse}})
+async def generate_agreement(
+    agreement_request: AgreementRequest,
+    assistant_service: AssistantService = Depends(get_ready_assistant)
+):
     """Generate a legal agreement (NDA, MSA, etc.)"""
     try:
-        assistant_service = request.app.state.assistant_service
-        
-        if not assistant_service.is_ready():
-            raise HTTPException(
-                status_code=500,
-                detail="Assistant service not initialized"
-            )
-        
-        logger.info(f"Generating {agreement_request.agreement_type} agreement (mutual: {agreement_request.is_mutual})")
+        logger.info(
+            "Generating %s agreement (mutual: %s)",
+            agreement_request.agreement_type,
+            agreement_request.is_mutual
+        )
         
         result = await assistant_service.generate_agreement(
             agreement_type=agreement_request.agreement_type,
@@ -167,16 +217,16 @@ async def generate_agreement(agreement_request: AgreementRequest, request: Reque
             is_mutual=agreement_request.is_mutual
         )
         
-        return AgreementResponse(
-            agreement_type=result["agreement_type"],
-            document=result["document"],
-            clauses_used=result["clauses_used"],
-            sources=result.get("sources", result["clauses_used"]),  # Use sources or fallback to clauses_used
-            success=True
-        )
+        return ORJSONResponse({
+            "agreement_type": result["agreement_type"],
+            "document": result["document"],
+            "clauses_used": result["clauses_used"],
+            "sources": result.get("sources", result["clauses_used"]),  # Use sources or fallback to clauses_used
+            "success": True
+        })
         
     except Exception as e:
-        logger.error(f"Error generating agreement: {str(e)}")
+        logger.error("Error generating agreement: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error generating agreement: {str(e)}"
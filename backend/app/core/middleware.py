@@ -0,0 +1,23 @@
+"""Custom middleware"""
+
+from typing import Iterable
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class StreamingAwareGZipMiddleware(GZipMiddleware):
+    """GZip middleware that leaves streaming endpoints uncompressed.
+
+    Starlette < 0.46 gzips ``text/event-stream`` responses without flushing
+    between chunks, which would hold back Server-Sent Events.
+    """
+
+    def __init__(self, app: ASGIApp, excluded_paths: Iterable[str] = (), **kwargs) -> None:
+        super().__init__(app, **kwargs)
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -1,35 +1,111 @@
 """Utility functions"""
 
 import logging
-from typing import Dict, Any
+import mmap
+import os
+import re
+from typing import Dict, Any, List
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
 
 logger = logging.getLogger(__name__)
 
+# Config files larger than this are parsed from a memory map instead of a copy
+_MMAP_THRESHOLD = 1024 * 1024
+
+# OpenAI keys: "sk-" followed by at least 20 URL-safe characters
+_API_KEY_MATCH = re.compile(r"sk-[A-Za-z0-9_-]{20,}").fullmatch
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Serialize to JSON bytes (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def json_loads(data) -> Any:
+    """Parse JSON from bytes or str (orjson when available)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_legal_sources(path: str = None) -> List[dict]:
+    """Load legal sources from the JSON config, falling back to the built-in list"""
+    path = path or settings.LEGAL_SOURCES_CONFIG
+    
+    if not os.path.exists(path):
+        logger.warning("Legal sources config not found at %s - using built-in list", path)
+        return [dict(source) for source in settings.LEGAL_SOURCES]
+    
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < _MMAP_THRESHOLD:
+            return json_loads(f.read())
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                return json_loads(view)
+            finally:
+                view.release()
+
+
+def load_top_queries(path: str = None, limit: int = None) -> List[str]:
+    """Load the most frequent past questions from a JSON-lines file.
+
+    Each line is ``{"question": ...}`` (optionally with a ``count``); lines
+    are expected in descending frequency order.
+    """
+    path = path or settings.TOP_QUERIES_PATH
+    limit = limit or settings.WARM_CACHE_LIMIT
+    if not os.path.exists(path):
+        return []
+
+    queries = []
+    with open(path, "rb") as f:
+        for line in f:
+            if len(queries) >= limit:
+                break
+            line = line.strip()
+            if line:
+                question = json_loads(line).get("question")
+                if question:
+                    queries.append(question)
+    return queries
+
 
 def format_sources_for_display(sources: list, max_length: int = 200) -> list:
     """Format source documents for display"""
-    formatted = []
-    for i, source in enumerate(sources, 1):
-        preview = source[:max_length] + "..." if len(source) > max_length else source
-        formatted.append(f"[{i}] {preview}")
-    return formatted
+    return [
+        f"[{i}] {source[:max_length]}..." if len(source) > max_length else f"[{i}] {source}"
+        for i, source in enumerate(sources, 1)
+    ]
 
 
 def validate_api_key(api_key: str) -> bool:
     """Validate OpenAI API key format"""
     if not api_key or api_key == "your_openai_api_key_here":
         return False
-    return api_key.startswith("sk-") and len(api_key) > 20
+    return _API_KEY_MATCH(api_key) is not None
 
 
 def log_request(endpoint: str, data: Dict[str, Any]) -> None:
     """Log API request details"""
-    logger.info(f"Request to {endpoint}: {data.get('question', 'N/A')[:50]}")
+    # Skip the lookup and truncation entirely when INFO is disabled
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Request to %s: %s", endpoint, data.get('question', 'N/A')[:50])
 
 
 def log_response(endpoint: str, success: bool, error: str = None) -> None:
     """Log API response details"""
     if success:
-        logger.info(f"Response from {endpoint}: Success")
+        logger.info("Response from %s: Success", endpoint)
     else:
-        logger.error(f"Response from {endpoint}: Failed - {error}")
+        logger.error("Response from %s: Failed - %s", endpoint, error)
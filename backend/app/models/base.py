@@ -1,19 +1,40 @@
 """Base models for shared fields and common patterns"""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import List, Optional
+from app.core.config import settings
+
+# Immutable models skip assignment bookkeeping; unknown fields are dropped
+FROZEN_MODEL_CONFIG = ConfigDict(
+    frozen=True,
+    extra="ignore",
+    populate_by_name=True,
+    validate_assignment=False
+)
 
 
 class BaseRequest(BaseModel):
     """Base request model with common fields"""
+    model_config = FROZEN_MODEL_CONFIG
+    
     chat_history: Optional[List[dict]] = Field(
         default=None,
         description="Previous chat history for context"
     )
+    
+    @field_validator("chat_history", mode="before")
+    @classmethod
+    def _trim_chat_history(cls, value):
+        """Keep only the messages prompts can use, before validating each one"""
+        if isinstance(value, list) and len(value) > settings.MAX_CHAT_HISTORY:
+            return value[-settings.MAX_CHAT_HISTORY:]
+        return value
 
 
 class BaseResponse(BaseModel):
     """Base response model with common fields"""
+    model_config = FROZEN_MODEL_CONFIG
+    
     success: bool = Field(default=True, description="Success status")
 
 
@@ -1,7 +1,6 @@
 """Request models for API endpoints"""
 
-from pydantic import Field
-from typing import Optional
+from pydantic import ConfigDict, Field
 from app.models.base import BaseRequest
 
 
@@ -9,13 +8,14 @@ class QueryRequest(BaseRequest):
     """Request model for legal queries"""
     question: str = Field(..., description="The legal question to ask")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "question": "What are the penalties for hacking under the IT Act?",
                 "chat_history": []
             }
         }
+    )
 
 
 class AgreementRequest(BaseRequest):
@@ -24,8 +24,8 @@ class AgreementRequest(BaseRequest):
     requirements: str = Field(default="", description="Specific requirements or customizations")
     is_mutual: bool = Field(default=True, description="For NDAs: mutual or unilateral")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "agreement_type": "nda",
                 "requirements": "Include 5-year confidentiality period and specific data protection clauses",
@@ -33,3 +33,4 @@ class AgreementRequest(BaseRequest):
                 "chat_history": []
             }
         }
+    )
@@ -1,19 +1,37 @@
 """Agreement generation service - handles contract/agreement creation"""
 
-from typing import Dict, List
+import asyncio
+import hashlib
+import json
+from typing import Dict, Optional
+from cachetools import LRUCache
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
 from app.services.vector_store import VectorStoreService
 from app.services.legal_graph import LegalGraphService
 import logging
 
 logger = logging.getLogger(__name__)
 
+_QUERY_WITH_REQUIREMENTS = "Generate a comprehensive {mode} {agreement_type} with the following requirements: {requirements}"
+_QUERY_STANDARD = "Generate a comprehensive {mode} {agreement_type} with all standard clauses including definitions, obligations, exclusions, term, remedies, and general provisions."
+
 
 class AgreementService:
     """Service for generating legal agreements"""
     
-    def __init__(self):
+    def __init__(self, embeddings: Optional[Embeddings] = None):
+        self.embeddings = embeddings
         self.vector_stores: Dict[str, VectorStoreService] = {}
+        self.graphs: Dict[str, LegalGraphService] = {}
         self._initialized = False
+        
+        # Generated documents keyed by request and corpus version
+        self._output_cache: LRUCache = LRUCache(maxsize=settings.AGREEMENT_CACHE_SIZE)
+        self._redis = None
+        if settings.REDIS_URL:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(settings.REDIS_URL)
     
     async def initialize(self, force_reload: bool = False) -> None:
         """Initialize agreement vector stores"""
@@ -23,33 +41,79 @@ class AgreementService:
         
         logger.info("Initializing agreement service...")
         
-        # Initialize NDA vector stores
-        self.vector_stores["nda_mutual"] = VectorStoreService(domain="nda_mutual")
-        await self.vector_stores["nda_mutual"].initialize(force_reload=force_reload)
+        # Initialize NDA vector stores (independent, so load them concurrently)
+        self.vector_stores["nda_mutual"] = VectorStoreService(domain="nda_mutual", embeddings=self.embeddings)
+        self.vector_stores["nda_unilateral"] = VectorStoreService(domain="nda_unilateral", embeddings=self.embeddings)
+        await asyncio.gather(*(
+            store.initialize(force_reload=force_reload)
+            for store in self.vector_stores.values()
+        ))
         
-        self.vector_stores["nda_unilateral"] = VectorStoreService(domain="nda_unilateral")
-        await self.vector_stores["nda_unilateral"].initialize(force_reload=force_reload)
+        # One graph per store, reused by every generate call
+        self.graphs = {
+            store_key: LegalGraphService(store)
+            for store_key, store in self.vector_stores.items()
+        }
         
         self._initialized = True
         logger.info("Agreement service initialized successfully")
     
-    def _get_vector_store(self, agreement_type: str, is_mutual: bool) -> VectorStoreService:
-        """Get the appropriate vector store for the agreement type"""
+    def _get_store_key(self, agreement_type: str, is_mutual: bool) -> str:
+        """Get the vector store key for the agreement type"""
         if agreement_type.lower() == "nda":
-            store_key = "nda_mutual" if is_mutual else "nda_unilateral"
-            return self.vector_stores.get(store_key)
+            return "nda_mutual" if is_mutual else "nda_unilateral"
         
         # Default to mutual NDA for other agreement types
-        return self.vector_stores.get("nda_mutual")
+        return "nda_mutual"
+    
+    def _get_vector_store(self, agreement_type: str, is_mutual: bool) -> VectorStoreService:
+        """Get the appropriate vector store for the agreement type"""
+        return self.vector_stores.get(self._get_store_key(agreement_type, is_mutual))
     
     def _build_query(self, agreement_type: str, is_mutual: bool, requirements: str) -> str:
         """Build the generation query from parameters"""
         agreement_mode = "mutual" if is_mutual else "unilateral"
         
         if requirements:
-            return f"Generate a comprehensive {agreement_mode} {agreement_type.upper()} with the following requirements: {requirements}"
+            return _QUERY_WITH_REQUIREMENTS.format(
+                mode=agreement_mode,
+                agreement_type=agreement_type.upper(),
+                requirements=requirements
+            )
         
-        return f"Generate a comprehensive {agreement_mode} {agreement_type.upper()} with all standard clauses including definitions, obligations, exclusions, term, remedies, and general provisions."
+        return _QUERY_STANDARD.format(mode=agreement_mode, agreement_type=agreement_type.upper())
+    
+    @staticmethod
+    def _cache_key(agreement_type: str, is_mutual: bool, requirements: str, corpus_version: str) -> str:
+        raw = f"{agreement_type.lower()}|{is_mutual}|{requirements}|{corpus_version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    async def _cache_get(self, key: str) -> Optional[Dict]:
+        """Look up a generated agreement in memory, then in Redis"""
+        result = self._output_cache.get(key)
+        if result is not None or self._redis is None:
+            return result
+        
+        try:
+            raw = await self._redis.get(f"agreement:{key}")
+        except Exception as e:
+            logger.warning("Agreement cache redis read failed: %s", e)
+            return None
+        if not raw:
+            return None
+        
+        result = json.loads(raw)
+        self._output_cache[key] = result
+        return result
+    
+    async def _cache_set(self, key: str, result: Dict) -> None:
+        self._output_cache[key] = result
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(f"agreement:{key}", json.dumps(result), ex=settings.AGREEMENT_CACHE_TTL)
+        except Exception as e:
+            logger.warning("Agreement cache redis write failed: %s", e)
     
     async def generate(
         self, 
@@ -67,22 +131,28 @@ class AgreementService:
         if not vector_store or vector_store.vector_store is None:
             raise RuntimeError(f"Vector store not available for {agreement_type}")
         
-        # Create specialized legal graph for agreements
-        agreement_graph = LegalGraphService(vector_store)
+        # Same request against the same corpus produces the same document
+        cache_key = self._cache_key(agreement_type, is_mutual, requirements, vector_store.corpus_version)
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            logger.info("Agreement cache hit")
+            return {"agreement_type": agreement_type, **cached, "success": True}
+        
+        agreement_graph = self.graphs[self._get_store_key(agreement_type, is_mutual)]
         
         # Build and execute query
         query = self._build_query(agreement_type, is_mutual, requirements)
-        result = agreement_graph.query(query, chat_history=None)
+        result = await agreement_graph.query(query, chat_history=None)
         
         sources = result.get("sources", [])
-        
-        return {
-            "agreement_type": agreement_type,
+        output = {
             "document": result["answer"],
             "clauses_used": sources,
-            "sources": sources,  # Include sources for API response
-            "success": True
+            "sources": sources  # Include sources for API response
         }
+        await self._cache_set(cache_key, output)
+        
+        return {"agreement_type": agreement_type, **output, "success": True}
     
     def is_ready(self) -> bool:
         """Check if service is ready"""
@@ -0,0 +1,136 @@
+"""Semantic answer cache for repeated legal queries"""
+
+import hashlib
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.utils import json_dumps, json_loads
+from app.services.semantic_cache import SemanticCache, question_key, unit_vector
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """Two-level answer cache: exact-hash L1 plus embedding-similarity lookup.
+
+    Entries are bounded and evicted in LRU order. When ``REDIS_URL`` is
+    configured, answers are also persisted to Redis so they survive restarts.
+    Redis keys carry the LLM model and corpus version, so a reload or model
+    change never serves answers built from the previous corpus.
+    """
+
+    def __init__(
+        self,
+        embeddings=None,
+        capacity: int = None,
+        threshold: float = None,
+        redis_url: str = None,
+        ttl: int = None,
+        corpus_version: str = ""
+    ):
+        self.embeddings = embeddings
+        self._key_prefix = self._redis_prefix(corpus_version)
+        self.ttl = ttl or settings.ANSWER_CACHE_TTL
+        self._cache = SemanticCache(
+            capacity=capacity or settings.ANSWER_CACHE_SIZE,
+            threshold=threshold if threshold is not None else settings.ANSWER_CACHE_THRESHOLD
+        )
+
+        self._redis = None
+        redis_url = settings.REDIS_URL if redis_url is None else redis_url
+        if redis_url:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(redis_url)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    async def embed(self, question: str) -> Optional[np.ndarray]:
+        """Embed a question as a unit-length float32 vector"""
+        if self.embeddings is None:
+            return None
+
+        try:
+            return unit_vector(await self.embeddings.aembed_query(question))
+        except Exception as e:
+            logger.warning("Answer cache embedding failed: %s", e)
+            return None
+
+    async def lookup(self, question: str) -> Tuple[Optional[Dict], Optional[np.ndarray]]:
+        """Return ``(cached_result, embedding)`` for a question.
+
+        The embedding is returned on a miss so the caller can hand it back to
+        :meth:`put` without a second embedding request.
+        """
+        key = question_key(question)
+
+        # L1: exact normalized match
+        result = self._cache.get(key)
+        if result is not None:
+            logger.info("Answer cache hit (exact)")
+            return result, None
+
+        # Near-duplicate wording (casing, punctuation, a changed word)
+        _, result = self._cache.get_fuzzy(question)
+        if result is not None:
+            logger.info("Answer cache hit (fuzzy)")
+            return result, None
+
+        # Persistent store shared across restarts/workers
+        result = await self._redis_get(key)
+        if result is not None:
+            self._cache.put(key, None, result, text=question)
+            logger.info("Answer cache hit (redis)")
+            return result, None
+
+        # L2: nearest cached question by cosine similarity
+        embedding = await self.embed(question)
+        _, result, score = self._cache.get_similar(embedding)
+        if result is not None:
+            logger.info("Answer cache hit (semantic, score=%.3f)", score)
+
+        return result, embedding
+
+    async def put(self, question: str, embedding: Optional[np.ndarray], result: Dict) -> None:
+        """Store the result for a question"""
+        key = question_key(question)
+        self._cache.put(key, embedding, result, text=question)
+        await self._redis_set(key, result)
+
+    def clear(self, corpus_version: str = None) -> None:
+        """Drop all in-memory entries (e.g. after documents are reloaded).
+
+        Passing the new ``corpus_version`` also moves Redis lookups to a fresh
+        key space; entries under the old one expire with their TTL.
+        """
+        self._cache.clear()
+        if corpus_version is not None:
+            self._key_prefix = self._redis_prefix(corpus_version)
+
+    @staticmethod
+    def _redis_prefix(corpus_version: str) -> str:
+        version = hashlib.blake2b(
+            f"{settings.LLM_MODEL}|{corpus_version}".encode("utf-8"), digest_size=8
+        ).hexdigest()
+        return f"answer:{version}:"
+
+    async def _redis_get(self, key: str) -> Optional[Dict]:
+        if self._redis is None:
+            return None
+        try:
+            raw = await self._redis.get(self._key_prefix + key)
+        except Exception as e:
+            logger.warning("Answer cache redis read failed: %s", e)
+            return None
+        return json_loads(raw) if raw else None
+
+    async def _redis_set(self, key: str, result: Dict) -> None:
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(self._key_prefix + key, json_dumps(result), ex=self.ttl)
+        except Exception as e:
+            logger.warning("Answer cache redis write failed: %s", e)
@@ -1,8 +1,12 @@
 """Main assistant service orchestrating all components"""
 
+import asyncio
+from app.core.utils import load_top_queries
+from app.services.embedding_cache import get_embeddings
+from app.services.semantic_cache import clear_retrieval_caches
 from app.services.legal_query_service import LegalQueryService
 from app.services.agreement_service import AgreementService
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,9 +16,12 @@ class AssistantService:
     """Main service for legal assistant functionality - orchestrates specialized services"""
     
     def __init__(self):
+        # Shared by every vector store so repeated texts are embedded once
+        self.embeddings = get_embeddings()
         self.legal_query_service: LegalQueryService = None
         self.agreement_service: AgreementService = None
         self._initialized = False
+        self._warm_task: Optional[asyncio.Task] = None
     
     async def initialize(self, force_reload: bool = False) -> None:
         """Initialize all services"""
@@ -24,16 +31,36 @@ class AssistantService:
         
         logger.info("Initializing assistant service...")
         
-        # Initialize legal query service (IPC/CrPC)
-        self.legal_query_service = LegalQueryService()
-        await self.legal_query_service.initialize(force_reload=force_reload)
+        # Cached retrievals may point at documents that are about to change
+        if force_reload:
+            clear_retrieval_caches()
         
-        # Initialize agreement service (NDAs, contracts)
-        self.agreement_service = AgreementService()
-        await self.agreement_service.initialize(force_reload=force_reload)
+        # Legal query service (IPC/CrPC) and agreement service (NDAs, contracts)
+        # are independent, so initialize them concurrently
+        self.legal_query_service = LegalQueryService(embeddings=self.embeddings)
+        self.agreement_service = AgreementService(embeddings=self.embeddings)
+        await asyncio.gather(
+            self.legal_query_service.initialize(force_reload=force_reload),
+            self.agreement_service.initialize(force_reload=force_reload)
+        )
         
         self._initialized = True
         logger.info("Assistant service initialized successfully")
+        
+        # Warm caches in the background so startup isn't delayed
+        self._warm_task = asyncio.create_task(self._warm_caches())
+    
+    async def _warm_caches(self) -> None:
+        """Pre-populate the retrieval cache with the most frequent past questions"""
+        try:
+            queries = await asyncio.to_thread(load_top_queries)
+            if not queries:
+                return
+            
+            warmed = await asyncio.to_thread(self.legal_query_service.legal_graph.warm_cache, queries)
+            logger.info("Warmed retrieval cache with %d queries", warmed)
+        except Exception as e:
+            logger.warning("Cache warming failed: %s", e)
     
     async def query(self, question: str, chat_history: List[dict] = None) -> Dict:
         """Process a legal query - delegates to legal query service"""
@@ -66,6 +93,13 @@ class AssistantService:
             is_mutual=is_mutual
         )
     
+    @property
+    def corpus_version(self) -> str:
+        """Version of the loaded legal corpus, identical across workers loading the same index"""
+        if self.legal_query_service is None or self.legal_query_service.vector_store is None:
+            return ""
+        return self.legal_query_service.vector_store.corpus_version
+    
     def is_ready(self) -> bool:
         """Check if all services are ready"""
         return (
@@ -1,15 +1,85 @@
 """Base graph service for reusable graph workflow logic"""
 
-from typing import TypedDict, List
-from langgraph.graph import StateGraph, END
+import asyncio
+import hashlib
+import re
+import threading
+from itertools import islice
+from typing import TypedDict, Iterable, List, Dict, Optional, Tuple
+from cachetools import LRUCache
 from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage, SystemMessage
 from app.core.config import settings
 from app.services.vector_store import VectorStoreService
+from app.services.llm import get_llm, llm_queue
+from app.services.semantic_cache import (
+    SemanticCache, get_response_cache, get_retrieval_cache, question_key, unit_vector
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Words that refer back to earlier turns; a question without them usually stands alone
+_ANAPHORA_RE = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|their|he|him|his|she|her|"
+    r"above|previous|earlier|same|former|latter|what about|how about|and|also)\b",
+    re.IGNORECASE
+)
+# Explicit statutory reference ("Section 302", "IPC", "CrPC", "... Act")
+_LEGAL_REFERENCE_RE = re.compile(r"\b(section\s*\d+[a-z]?|ipc|crpc|act)\b", re.IGNORECASE)
+# Leading question word or imperative
+_STANDALONE_START_RE = re.compile(
+    r"(what|which|who|whom|whose|when|where|why|how|is|are|can|could|does|do|"
+    r"should|will|would|explain|define|describe|list)\b",
+    re.IGNORECASE
+)
+# Shorter questions ("What is the maximum punishment?") usually lean on the history
+_MIN_STANDALONE_WORDS = 8
+
+REFORMULATION_SYS_PROMPT = """You are a helpful assistant that reformulates follow-up questions to be standalone questions.
+            
+Given a conversation history and a follow-up question, reformulate the question to include necessary context from the conversation.
+The reformulated question should be a complete, standalone question that can be understood without the conversation history.
+
+If the question is already standalone, return it as-is."""
+
+REFORMULATION_HUMAN_PROMPT = """Conversation History:
+{conversation_history}
+
+Follow-up Question: {question}
+
+Reformulated Question:"""
+
+# Most recent messages used for reformulation and for the answer prompt
+REFORMULATION_HISTORY_MESSAGES = 6
+MAX_HISTORY_MESSAGES = settings.MAX_CHAT_HISTORY
+_ROLE_PREFIXES = {"user": "User: ", "assistant": "Assistant: ", "system": "System: "}
+
+# Reformulations keyed by the exact prompt inputs, shared across service instances
+_reformulation_cache: LRUCache = LRUCache(maxsize=1024)
+_reformulation_lock = threading.Lock()
+
+
+def render_history(chat_history: Iterable[dict], limit: int) -> str:
+    """Render the last ``limit`` messages as ``Role: content`` lines"""
+    skip = max(len(chat_history) - limit, 0)
+    return "\n".join(
+        f"{_ROLE_PREFIXES.get(msg['role']) or msg['role'].capitalize() + ': '}{msg['content']}"
+        for msg in islice(chat_history, skip, None)
+    )
+
+
+def is_standalone_question(question: str) -> bool:
+    """Cheap check for follow-ups that need no rewriting before retrieval"""
+    question = question.strip()
+    if _ANAPHORA_RE.search(question) is not None:
+        return False
+    return _LEGAL_REFERENCE_RE.search(question) is not None or (
+        len(question.split()) >= _MIN_STANDALONE_WORDS
+        and _STANDALONE_START_RE.match(question) is not None
+    )
+
 
 class GraphState(TypedDict):
     """Base state for graph workflows"""
@@ -18,20 +88,20 @@ class GraphState(TypedDict):
     context: str
     answer: str
     chat_history: List[dict]
+    cache_key: str
 
 
 class BaseGraphService:
     """Base class for graph-based services with common functionality"""
     
-    def __init__(self, vector_store_service: VectorStoreService):
+    def __init__(self, vector_store_service: VectorStoreService, llm: Optional[ChatOpenAI] = None):
         self.vector_store_service = vector_store_service
-        self.llm = ChatOpenAI(
-            model=settings.LLM_MODEL,
-            temperature=settings.TEMPERATURE,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
+        self.llm = llm or get_llm()
+        # (law, section, title, content) -> formatted context block
+        self._chunk_fmt_cache: LRUCache = LRUCache(maxsize=10000)
+        self._chunk_fmt_lock = threading.Lock()
     
-    def _reformulate_question(self, state: GraphState) -> str:
+    async def _reformulate_question(self, state: GraphState) -> str:
         """Reformulate question using chat history for better retrieval"""
         question = state['question']
         chat_history = state.get('chat_history', [])
@@ -40,67 +110,218 @@ class BaseGraphService:
         if not chat_history or len(chat_history) == 0:
             return question
         
+        # Skip the LLM round-trip for follow-ups that already stand alone
+        if is_standalone_question(question):
+            logger.info("Skipping reformulation for standalone question")
+            return question
+        
         # Build conversation context from recent history
-        recent_history = chat_history[-6:] if len(chat_history) > 6 else chat_history
-        conversation_context = "\n".join([
-            f"{msg['role'].capitalize()}: {msg['content']}"
-            for msg in recent_history
-        ])
-        
-        # Use LLM to reformulate question with context
-        reformulation_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a helpful assistant that reformulates follow-up questions to be standalone questions.
-            
-Given a conversation history and a follow-up question, reformulate the question to include necessary context from the conversation.
-The reformulated question should be a complete, standalone question that can be understood without the conversation history.
-
-If the question is already standalone, return it as-is."""),
-            ("human", """Conversation History:
-{conversation_history}
-
-Follow-up Question: {question}
-
-Reformulated Question:""")
-        ])
+        conversation_context = render_history(chat_history, REFORMULATION_HISTORY_MESSAGES)
+        
+        cache_key = hashlib.sha1(f"{conversation_context}\0{question}".encode("utf-8")).hexdigest()
+        with _reformulation_lock:
+            reformulated = _reformulation_cache.get(cache_key)
+        if reformulated is not None:
+            return reformulated
         
         try:
-            messages = reformulation_prompt.format_messages(
-                conversation_history=conversation_context,
-                question=question
-            )
-            response = self.llm.invoke(messages)
+            messages = [
+                SystemMessage(content=REFORMULATION_SYS_PROMPT),
+                HumanMessage(content=REFORMULATION_HUMAN_PROMPT.format(
+                    conversation_history=conversation_context,
+                    question=question
+                ))
+            ]
+            response = await llm_queue.submit(self.llm, messages)
             reformulated = response.content.strip()
-            logger.info(f"Reformulated question: '{question}' -> '{reformulated}'")
+            logger.info("Reformulated question: '%s' -> '%s'", question, reformulated)
+            with _reformulation_lock:
+                _reformulation_cache[cache_key] = reformulated
             return reformulated
         except Exception as e:
-            logger.warning(f"Question reformulation failed: {e}. Using original question.")
+            logger.warning("Question reformulation failed: %s. Using original question.", e)
             return question
     
-    def _retrieve(self, state: GraphState, k: int = None) -> GraphState:
+    @property
+    def retrieval_cache(self) -> SemanticCache:
+        """Retrieval cache shared by all services searching the same domain"""
+        return get_retrieval_cache(self.vector_store_service.domain)
+    
+    @property
+    def response_cache(self) -> SemanticCache:
+        """Exact (question, history) -> response cache for this domain"""
+        return get_response_cache(self.vector_store_service.domain)
+    
+    @staticmethod
+    def _response_key(question: str, chat_history: Iterable[dict]) -> str:
+        """Key covering everything the answer depends on besides the corpus"""
+        history = render_history(chat_history, MAX_HISTORY_MESSAGES) if chat_history else ""
+        return question_key(f"{history}\0{question}")
+    
+    def _cached_response(self, question: str, chat_history: Iterable[dict]) -> Tuple[str, Optional[Dict]]:
+        """Return the response cache key and the cached response, if any"""
+        key = self._response_key(question, chat_history)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            logger.info("Response cache hit")
+        return key, cached
+    
+    @staticmethod
+    def _initial_state(question: str, chat_history: Iterable[dict] = None) -> GraphState:
+        """Fresh graph state for a question"""
+        return {
+            "question": question,
+            "retrieved_documents": [],
+            "context": "",
+            "answer": "",
+            "chat_history": chat_history or [],
+            "cache_key": ""
+        }
+    
+    def _search(self, search_query: str, k: int, cancelled: Optional[threading.Event] = None) -> Tuple[str, Dict]:
+        """Retrieve documents for a query, reusing results of near-duplicate queries.
+        
+        A search whose ``cancelled`` event is set by the time results arrive
+        returns them without writing them to the cache.
+        
+        Returns the key of the cache entry actually used (the matched entry's on a
+        fuzzy or semantic hit) and a ``{retrieved_documents, context, answer}``
+        entry; ``answer`` is empty until one has been generated for it.
+        """
+        cache = self.retrieval_cache
+        key = question_key(search_query)
+        
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info("Retrieval cache hit (exact)")
+            return key, cached
+        
+        matched_key, cached = cache.get_fuzzy(search_query)
+        if cached is not None:
+            logger.info("Retrieval cache hit (fuzzy)")
+            return matched_key, cached
+        
+        # Embed once: the same vector probes the cache and searches the store
+        query_vector = self.vector_store_service.embed(search_query)
+        unit = unit_vector(query_vector)
+        matched_key, cached, score = cache.get_similar(unit)
+        if cached is not None:
+            logger.info("Retrieval cache hit (semantic, score=%.3f)", score)
+            return matched_key, cached
+        
+        results = self.vector_store_service.similarity_search_by_vector(query_vector, k=k)
+        entry = self._build_entry(results)
+        if cancelled is None or not cancelled.is_set():
+            cache.put(key, unit, entry, text=search_query)
+        
+        logger.info("Retrieved %d documents", len(results))
+        return key, entry
+    
+    def _build_entry(self, results: List[Document]) -> Dict:
+        """Retrieval cache entry for a list of search results.
+        
+        Documents and context blocks are built in one pass over the results.
+        Blocks are then put in a fixed (law, section) order so the same sections
+        always yield the same prompt bytes, whatever their relevance ranking.
+        """
+        retrieved_documents, blocks = [], []
+        for doc in results:
+            metadata = doc.metadata
+            law = metadata.get('law', 'IPC')
+            section = metadata.get('section', 'N/A')
+            title = metadata.get('title', '')
+            content = doc.page_content
+            retrieved_documents.append({"section": section, "title": title, "content": content})
+            blocks.append(((str(law), str(section)), self._format_chunk(law, section, title, content)))
+        
+        blocks.sort(key=lambda block: block[0])
+        return {
+            "retrieved_documents": retrieved_documents,
+            "context": "\n\n---\n\n".join(block for _, block in blocks),
+            "answer": ""
+        }
+    
+    def warm_cache(self, queries: List[str], k: int = None) -> int:
+        """Pre-populate the retrieval cache without calling the LLM.
+        
+        Queries not cached yet are embedded in one batch; returns how many
+        entries were added.
+        """
+        if self.vector_store_service.vector_store is None:
+            return 0
+        
+        k = k or settings.TOP_K_RESULTS
+        cache = self.retrieval_cache
+        pending = {question_key(query): query for query in queries}
+        pending = {key: query for key, query in pending.items() if cache.get(key) is None}
+        if not pending:
+            return 0
+        
+        vectors = self.vector_store_service.embed_batch(list(pending.values()))
+        for (key, query), vector in zip(pending.items(), vectors):
+            results = self.vector_store_service.similarity_search_by_vector(vector, k=k)
+            cache.put(key, unit_vector(vector), self._build_entry(results), text=query)
+        
+        return len(pending)
+    
+    def _format_chunk(self, law: str, section: str, title: str, content: str) -> str:
+        """Format one retrieved chunk, reusing the string built for earlier requests"""
+        # Long sections are split into several chunks, so the content is part
+        # of the key; the store hands back the same string objects every time,
+        # so hashing them is cheap
+        key = (law, section, title, content)
+        
+        with self._chunk_fmt_lock:
+            formatted = self._chunk_fmt_cache.get(key)
+            if formatted is None:
+                formatted = self._chunk_fmt_cache[key] = f"Source: {law} Section {section}: {title}\n{content}"
+        return formatted
+    
+    async def _asearch(self, state: GraphState, k: int) -> Tuple[str, Dict]:
+        """Reformulate and search without blocking the event loop.
+        
+        When the question needs rewriting, a speculative search on the raw
+        question runs alongside the reformulation LLM call and is kept if the
+        rewrite turns out not to change the query.
+        """
+        question = state['question']
+        if not state.get('chat_history') or is_standalone_question(question):
+            return await asyncio.to_thread(self._search, question, k)
+        
+        # Cancelling the task cannot stop its worker thread, so the event keeps
+        # an abandoned search from filling the cache
+        abandoned = threading.Event()
+        speculative = asyncio.create_task(asyncio.to_thread(self._search, question, k, abandoned))
+        search_query = await self._reformulate_question(state)
+        if question_key(search_query) == question_key(question):
+            return await speculative
+        
+        abandoned.set()
+        speculative.cancel()
+        return await asyncio.to_thread(self._search, search_query, k)
+    
+    def _remember_answer(self, key: str, answer: str) -> None:
+        """Attach a generated answer to a cached retrieval entry"""
+        entry = self.retrieval_cache.get(key)
+        if entry is not None and answer:
+            self.retrieval_cache.update(key, {**entry, "answer": answer})
+    
+    async def _retrieve(self, state: GraphState, k: int = None) -> GraphState:
         """Retrieve relevant documents - common retrieval logic"""
-        search_query = self._reformulate_question(state)
-        logger.info(f"Retrieving documents for: {search_query}")
+        search_query = await self._reformulate_question(state)
+        logger.info("Retrieving documents for: %s", search_query)
         
         k = k or settings.TOP_K_RESULTS
-        results = self.vector_store_service.similarity_search(search_query, k=k)
-        
-        # Store as structured data
-        state['retrieved_documents'] = [
-            {
-                "section": doc.metadata.get('section', 'N/A'),
-                "title": doc.metadata.get('title', ''),
-                "content": doc.page_content
-            }
-            for doc in results
-        ]
+        key, entry = await asyncio.to_thread(self._search, search_query, k)
+        
+        state['cache_key'] = key
+        state['retrieved_documents'] = entry['retrieved_documents']
+        state['context'] = entry['context']
         
-        # Build context string
-        state['context'] = "\n\n---\n\n".join([
-            f"Source: {doc.metadata.get('law', 'IPC')} Section {doc.metadata.get('section', 'N/A')}: {doc.metadata.get('title', '')}\n{doc.page_content}"
-            for doc in results
-        ])
+        # Cached answers are only reused for standalone questions
+        if not state.get('chat_history'):
+            state['answer'] = entry['answer']
         
-        logger.info(f"Retrieved {len(results)} documents")
         return state
     
     def _build_conversation_context(self, chat_history: List[dict]) -> str:
@@ -108,11 +329,7 @@ Reformulated Question:""")
         if not chat_history or len(chat_history) == 0:
             return ""
         
-        recent_history = chat_history[-8:] if len(chat_history) > 8 else chat_history
-        return "\n".join([
-            f"{msg['role'].capitalize()}: {msg['content']}"
-            for msg in recent_history
-        ])
+        return render_history(chat_history, MAX_HISTORY_MESSAGES)
     
     def _format_sources_as_strings(self, documents: List[dict]) -> List[str]:
         """Format retrieved documents as string list for API response"""
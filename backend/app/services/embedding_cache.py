@@ -0,0 +1,285 @@
+"""LRU cache in front of the embedding provider, backed by SQLite and optionally Redis"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+from cachetools import LRUCache
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbedder(Embeddings):
+    """Embeddings wrapper that skips the network round-trip for repeated texts.
+
+    Keys include the embedding model name so vectors from different models
+    never collide. The lock only guards cache access, never the HTTP call.
+    Vectors are persisted to a SQLite file (``EMBEDDING_CACHE_PATH``) so they
+    survive restarts. When ``REDIS_URL`` is configured, vectors are also
+    written through to Redis so every worker process and host shares them.
+    Cached vectors are kept as float32 arrays (4 bytes per dimension instead
+    of a Python float object each) and only become lists at the LangChain
+    interface.
+    """
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        capacity: int = 10000,
+        model: str = None,
+        redis_url: str = None,
+        ttl: int = None,
+        path: str = None
+    ):
+        self.inner = inner
+        self.model = model or settings.EMBEDDING_MODEL
+        self.ttl = ttl or settings.EMBEDDING_CACHE_TTL
+        self._cache: LRUCache = LRUCache(maxsize=capacity)
+        self._lock = threading.Lock()
+
+        self._db = None
+        self._db_lock = threading.Lock()
+        path = settings.EMBEDDING_CACHE_PATH if path is None else path
+        if path:
+            self._db = self._open_db(path)
+
+        self._redis = None
+        self._aredis = None
+        redis_url = settings.REDIS_URL if redis_url is None else redis_url
+        if redis_url:
+            import redis
+            import redis.asyncio as aredis
+            self._redis = redis.from_url(redis_url)
+            self._aredis = aredis.from_url(redis_url)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            return self._cache.get(key)
+
+    def _set(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._cache[key] = vector
+
+    def _partition(self, texts: List[str]):
+        """Split texts into cached vectors and the unique keys still to embed"""
+        keys = [self._key(text) for text in texts]
+        vectors = [self._get(key) for key in keys]
+        misses = {}
+        for text, key, vector in zip(texts, keys, vectors):
+            if vector is None and key not in misses:
+                misses[key] = text
+        return keys, vectors, misses
+
+    def _merge(self, keys: List[str], vectors: List, fresh: Dict[str, np.ndarray]) -> List[np.ndarray]:
+        for key, vector in fresh.items():
+            self._set(key, vector)
+        return [vector if vector is not None else fresh[key] for key, vector in zip(keys, vectors)]
+
+    # SQLite (persistent)
+
+    @staticmethod
+    def _open_db(path: str) -> Optional[sqlite3.Connection]:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS embed_cache (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+            return db
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache disabled, cannot open %s: %s", path, e)
+            return None
+
+    def _db_fetch(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if self._db is None or not keys:
+            return {}
+        found = {}
+        try:
+            with self._db_lock:
+                # Stay well below SQLite's bound-parameter limit
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vec FROM embed_cache WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    found.update((key, self._decode(vec)) for key, vec in rows)
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache read failed: %s", e)
+        return found
+
+    def _db_store(self, fresh: Dict[str, np.ndarray]) -> None:
+        if self._db is None or not fresh:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embed_cache (key, vec) VALUES (?, ?)",
+                    [(key, self._encode(vector)) for key, vector in fresh.items()]
+                )
+                self._db.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache write failed: %s", e)
+
+    # Redis (shared)
+
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        return f"embed:{key}"
+
+    @staticmethod
+    def _decode(raw: Optional[bytes]) -> Optional[np.ndarray]:
+        return np.frombuffer(raw, dtype=np.float32) if raw else None
+
+    @staticmethod
+    def _encode(vector: np.ndarray) -> bytes:
+        return vector.tobytes()
+
+    @staticmethod
+    def _as_arrays(vectors: List[List[float]]) -> List[np.ndarray]:
+        return [np.asarray(vector, dtype=np.float32) for vector in vectors]
+
+    def _redis_fetch(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if self._redis is None or not keys:
+            return {}
+        try:
+            raws = self._redis.mget([self._redis_key(key) for key in keys])
+        except Exception as e:
+            logger.warning("Embedding cache redis read failed: %s", e)
+            return {}
+        return {key: self._decode(raw) for key, raw in zip(keys, raws) if raw}
+
+    def _redis_store(self, fresh: Dict[str, np.ndarray]) -> None:
+        if self._redis is None or not fresh:
+            return
+        try:
+            with self._redis.pipeline(transaction=False) as pipe:
+                for key, vector in fresh.items():
+                    pipe.set(self._redis_key(key), self._encode(vector), ex=self.ttl)
+                pipe.execute()
+        except Exception as e:
+            logger.warning("Embedding cache redis write failed: %s", e)
+
+    async def _aredis_fetch(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if self._aredis is None or not keys:
+            return {}
+        try:
+            raws = await self._aredis.mget([self._redis_key(key) for key in keys])
+        except Exception as e:
+            logger.warning("Embedding cache redis read failed: %s", e)
+            return {}
+        return {key: self._decode(raw) for key, raw in zip(keys, raws) if raw}
+
+    async def _aredis_store(self, fresh: Dict[str, np.ndarray]) -> None:
+        if self._aredis is None or not fresh:
+            return
+        try:
+            async with self._aredis.pipeline(transaction=False) as pipe:
+                for key, vector in fresh.items():
+                    pipe.set(self._redis_key(key), self._encode(vector), ex=self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("Embedding cache redis write failed: %s", e)
+
+    # Public API
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a single text as a float32 vector"""
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed many texts, sending only cache misses in a single request"""
+        keys, vectors, misses = self._partition(texts)
+
+        fresh = self._db_fetch(list(misses))
+        remaining = [key for key in misses if key not in fresh]
+        if remaining:
+            shared = self._redis_fetch(remaining)
+            self._db_store(shared)
+            fresh.update(shared)
+
+        remaining = {key: misses[key] for key in remaining if key not in fresh}
+        if remaining:
+            embedded = dict(zip(remaining, self._as_arrays(self.inner.embed_documents(list(remaining.values())))))
+            self._db_store(embedded)
+            self._redis_store(embedded)
+            fresh.update(embedded)
+
+        return self._merge(keys, vectors, fresh)
+
+    async def aembed(self, text: str) -> np.ndarray:
+        """Embed a single text asynchronously as a float32 vector"""
+        return (await self.aembed_batch([text]))[0]
+
+    async def aembed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed many texts asynchronously, sending only cache misses"""
+        keys, vectors, misses = self._partition(texts)
+
+        # SQLite is blocking disk I/O; keep it off the event loop
+        fresh = await asyncio.to_thread(self._db_fetch, list(misses))
+        remaining = [key for key in misses if key not in fresh]
+        if remaining:
+            shared = await self._aredis_fetch(remaining)
+            await asyncio.to_thread(self._db_store, shared)
+            fresh.update(shared)
+
+        remaining = {key: misses[key] for key in remaining if key not in fresh}
+        if remaining:
+            new_vectors = await self.inner.aembed_documents(list(remaining.values()))
+            embedded = dict(zip(remaining, self._as_arrays(new_vectors)))
+            await asyncio.to_thread(self._db_store, embedded)
+            await self._aredis_store(embedded)
+            fresh.update(embedded)
+
+        return self._merge(keys, vectors, fresh)
+
+    # LangChain Embeddings interface (used by FAISS)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed(text).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [vector.tolist() for vector in self.embed_batch(texts)]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed(text)).tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [vector.tolist() for vector in await self.aembed_batch(texts)]
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> CachedEmbedder:
+    """Process-wide cached embedder shared by every vector store"""
+    if settings.EMBEDDING_PROVIDER == "local":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return CachedEmbedder(
+            HuggingFaceEmbeddings(
+                model_name=settings.LOCAL_EMBEDDING_MODEL,
+                encode_kwargs={"batch_size": 128, "normalize_embeddings": True}
+            ),
+            model=settings.LOCAL_EMBEDDING_MODEL
+        )
+
+    return CachedEmbedder(
+        OpenAIEmbeddings(
+            model=settings.EMBEDDING_MODEL,
+            openai_api_key=settings.OPENAI_API_KEY
+        )
+    )
@@ -0,0 +1,44 @@
+"""FAISS index factory shared by the app and legacy vector stores"""
+
+import logging
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def build_index(
+    vectors: np.ndarray,
+    metric: int,
+    hnsw_min_vectors: int,
+    hnsw_m: int,
+    ef_construction: int,
+    ef_search: int,
+    quantize: bool = False
+) -> faiss.Index:
+    """Index the vectors under ``metric``: exact flat for small corpora, HNSW for large ones.
+
+    With ``quantize`` the index keeps 8-bit scalar codes instead of float32
+    vectors, trading a little precision for a 4x smaller index.
+    """
+    dim = vectors.shape[1]
+    quantizer_type = faiss.ScalarQuantizer.QT_8bit
+    if len(vectors) >= hnsw_min_vectors:
+        logger.info("Building HNSW index over %d vectors", len(vectors))
+        if quantize:
+            index = faiss.IndexHNSWSQ(dim, quantizer_type, hnsw_m, metric)
+        else:
+            index = faiss.IndexHNSWFlat(dim, hnsw_m, metric)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+    elif quantize:
+        index = faiss.IndexScalarQuantizer(dim, quantizer_type, metric)
+    else:
+        index = faiss.IndexFlat(dim, metric)
+
+    # Scalar quantizers learn per-dimension value ranges before adding
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
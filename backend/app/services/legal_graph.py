@@ -1,38 +1,21 @@
 """Legal graph service using LangGraph"""
 
-from typing import List, Dict
+import asyncio
+from typing import List, Dict, Optional
 from langgraph.graph import StateGraph, END
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI
 from app.core.config import settings
 from app.services.vector_store import VectorStoreService
 from app.services.base_graph_service import BaseGraphService, GraphState
+from app.services.llm import llm_queue
 import logging
 
 logger = logging.getLogger(__name__)
 
-
-class LegalGraphService(BaseGraphService):
-    """LangGraph workflow for legal question answering"""
-    
-    def __init__(self, vector_store_service: VectorStoreService):
-        super().__init__(vector_store_service)
-        self.graph = self._build_graph()
-    
-    def _retrieve(self, state: GraphState) -> GraphState:
-        """Retrieve relevant legal documents"""
-        return super()._retrieve(state, k=settings.TOP_K_RESULTS)
-    
-    def _generate(self, state: GraphState) -> GraphState:
-        """Generate answer based on retrieved context and chat history"""
-        logger.info("Generating answer...")
-        
-        # Build conversation history string using base class method
-        conversation_context = self._build_conversation_context(state.get('chat_history', []))
-        
-        # Build prompt with or without conversation history
-        if conversation_context:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", """You are an expert Indian legal assistant specializing in the Indian criminal law (IPC and CrPC).
+# Static instructions go first so every request shares the same token prefix
+# and the provider's prompt cache can reuse it; {context} comes last.
+SYS_PROMPT = """You are an expert Indian legal assistant specializing in the Indian criminal law (IPC and CrPC).
 
 IMPORTANT: You must ONLY answer questions based on the legal sections provided in the context below. Do NOT use external knowledge.
 
@@ -45,49 +28,91 @@ Rules:
 - Do NOT make up or assume information not present in the context
 
 Context from Indian Laws (IPC & CrPC):
-{context}"""),
-                ("human", """Previous Conversation:
+{context}"""
+
+HUMAN_PROMPT_WITH_HISTORY = """Previous Conversation:
 {conversation_history}
 
 Current Question: {question}
 
-Answer based ONLY on the legal sections provided in the context above.""")
-            ])
-            
-            messages = prompt.format_messages(
-                context=state['context'],
-                conversation_history=conversation_context,
-                question=state['question']
-            )
-        else:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", """You are an expert Indian legal assistant specializing in the Indian criminal law (IPC and CrPC).
+Answer based ONLY on the legal sections provided in the context above."""
 
-IMPORTANT: You must ONLY answer questions based on the legal sections provided in the context below. Do NOT use external knowledge.
+HUMAN_PROMPT_NO_HISTORY = """Question: {question}
 
-Rules:
-- ONLY cite legal sections that are provided in the context
-- If the provided context doesn't contain information to answer the question, clearly state: "I don't have information about this in the provided legal sections."
-- Always cite specific IPC section numbers and titles from the context
-- Provide clear, accurate legal guidance based ONLY on the provided sections
-- Recommend consulting a qualified lawyer for specific legal advice
-- Do NOT make up or assume information not present in the context
+Answer based ONLY on the legal sections provided in the context above."""
 
-Context from Indian Laws (IPC & CrPC):
-{context}"""),
-                ("human", """Question: {question}
 
-Answer based ONLY on the legal sections provided in the context above.""")
-            ])
-            
-            messages = prompt.format_messages(
-                context=state['context'],
-                question=state['question']
+class LegalGraphService(BaseGraphService):
+    """LangGraph workflow for legal question answering"""
+    
+    def __init__(self, vector_store_service: VectorStoreService, llm: Optional[ChatOpenAI] = None):
+        super().__init__(vector_store_service, llm)
+        self.graph = self._build_graph()
+    
+    async def _retrieve(self, state: GraphState) -> GraphState:
+        """Retrieve relevant legal documents"""
+        return await super()._retrieve(state, k=settings.TOP_K_RESULTS)
+    
+    def _build_messages(self, context: str, question: str, conversation_context: str) -> List[BaseMessage]:
+        """Format the answer prompt, with conversation history when there is any"""
+        system = SystemMessage(content=SYS_PROMPT.format(context=context))
+        if conversation_context:
+            human = HUMAN_PROMPT_WITH_HISTORY.format(
+                conversation_history=conversation_context,
+                question=question
             )
+        else:
+            human = HUMAN_PROMPT_NO_HISTORY.format(question=question)
+        return [system, HumanMessage(content=human)]
+    
+    async def _replay(self, question: str, retrieved_documents: List[dict], answer: str):
+        """Stream events for an answer that is already known"""
+        yield {
+            "type": "sources",
+            "sources": retrieved_documents
+        }
+        yield {
+            "type": "content",
+            "content": answer
+        }
+        yield {
+            "type": "done",
+            "question": question,
+            "answer": answer
+        }
+    
+    def _remember_response(self, key: str, answer: str, retrieved_documents: List[dict]) -> None:
+        if answer:
+            self.response_cache.put(key, None, {"answer": answer, "retrieved_documents": retrieved_documents})
+    
+    async def _astream_answer(self, messages: list, chunks: asyncio.Queue) -> None:
+        """Push streamed answer chunks into a queue, ending with ``None``"""
+        try:
+            async for chunk in self.llm.astream(messages):
+                if chunk.content:
+                    chunks.put_nowait(chunk.content)
+        finally:
+            chunks.put_nowait(None)
+    
+    async def _generate(self, state: GraphState) -> GraphState:
+        """Generate answer based on retrieved context and chat history"""
+        if state.get('answer'):
+            logger.info("Using cached answer")
+            return state
+        
+        logger.info("Generating answer...")
         
-        response = self.llm.invoke(messages)
+        # Build conversation history string using base class method
+        conversation_context = self._build_conversation_context(state.get('chat_history', []))
+        
+        messages = self._build_messages(state['context'], state['question'], conversation_context)
+        
+        response = await llm_queue.submit(self.llm, messages)
         state['answer'] = response.content
         
+        if not conversation_context:
+            self._remember_answer(state.get('cache_key', ''), state['answer'])
+        
         logger.info("Answer generated")
         return state
     
@@ -106,17 +131,22 @@ Answer based ONLY on the legal sections provided in the context above.""")
         
         return workflow.compile()
     
-    def query(self, question: str, chat_history: List[dict] = None) -> Dict:
+    async def query(self, question: str, chat_history: List[dict] = None) -> Dict:
         """Query the legal assistant"""
-        initial_state = {
-            "question": question,
-            "retrieved_documents": [],
-            "context": "",
-            "answer": "",
-            "chat_history": chat_history or []
-        }
+        response_key, cached = self._cached_response(question, chat_history)
+        if cached is not None:
+            return {
+                "question": question,
+                "answer": cached["answer"],
+                "sources": self._format_sources_as_strings(cached["retrieved_documents"])
+            }
+        
+        # Straight-line retrieve -> generate; the compiled graph only adds
+        # orchestration overhead for a two-node pipeline
+        result = await self._retrieve(self._initial_state(question, chat_history))
+        result = await self._generate(result)
         
-        result = self.graph.invoke(initial_state)
+        self._remember_response(response_key, result["answer"], result["retrieved_documents"])
         
         # Convert retrieved_documents to strings for API response
         sources = self._format_sources_as_strings(result["retrieved_documents"])
@@ -129,118 +159,59 @@ Answer based ONLY on the legal sections provided in the context above.""")
     
     async def query_stream(self, question: str, chat_history: List[dict] = None):
         """Query the legal assistant with streaming response"""
+        response_key, cached = self._cached_response(question, chat_history)
+        if cached is not None:
+            async for event in self._replay(question, cached["retrieved_documents"], cached["answer"]):
+                yield event
+            return
+        
         # Step 1: Reformulate and retrieve (non-streaming)
-        initial_state = {
-            "question": question,
-            "retrieved_documents": [],
-            "context": "",
-            "answer": "",
-            "chat_history": chat_history or []
-        }
+        initial_state = self._initial_state(question, chat_history)
         
-        # Reformulate question with chat history
-        search_query = self._reformulate_question(initial_state)
+        # Reformulate and retrieve (or reuse documents of a near-duplicate query)
+        cache_key, entry = await self._asearch(initial_state, settings.TOP_K_RESULTS)
+        retrieved_documents = entry['retrieved_documents']
         
-        # Retrieve documents
-        results = self.vector_store_service.similarity_search(
-            search_query,
-            k=settings.TOP_K_RESULTS
-        )
+        # Standalone question answered before: replay the cached answer
+        if not chat_history and entry['answer']:
+            async for event in self._replay(question, retrieved_documents, entry['answer']):
+                yield event
+            return
+        
+        # Step 2: Generate answer with streaming
+        conversation_context = self._build_conversation_context(initial_state['chat_history'])
+        
+        messages = self._build_messages(entry['context'], question, conversation_context)
+        
+        # Start the LLM request before sending sources so prompt prefill
+        # overlaps with delivering the sources event
+        chunks: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.create_task(self._astream_answer(messages, chunks))
         
-        retrieved_documents = [
-            {
-                "section": doc.metadata.get('section', 'N/A'),
-                "title": doc.metadata.get('title', ''),
-                "content": doc.page_content
-            }
-            for doc in results
-        ]
-        context = "\n\n---\n\n".join([
-            f"Source: {doc.metadata.get('law', 'IPC')} Section {doc.metadata.get('section', 'N/A')}: {doc.metadata.get('title', '')}\n{doc.page_content}"
-            for doc in results
-        ])
-        
-        # Send sources first
         yield {
             "type": "sources",
             "sources": retrieved_documents
         }
         
-        # Step 2: Generate answer with streaming
-        chat_history_data = initial_state.get('chat_history', [])
-        conversation_context = ""
-        if chat_history_data and len(chat_history_data) > 0:
-            recent_history = chat_history_data[-8:] if len(chat_history_data) > 8 else chat_history_data
-            conversation_context = "\n".join([
-                f"{msg['role'].capitalize()}: {msg['content']}"
-                for msg in recent_history
-            ])
-        
-        # Build prompt
-        if conversation_context:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", """You are an expert Indian legal assistant specializing in the Indian criminal law (IPC and CrPC).
-
-IMPORTANT: You must ONLY answer questions based on the legal sections provided in the context below. Do NOT use external knowledge.
-
-Rules:
-- ONLY cite legal sections that are provided in the context
-- If the provided context doesn't contain information to answer the question, clearly state: "I don't have information about this in the provided legal sections."
-- Always cite specific IPC section numbers and titles from the context
-- Provide clear, accurate legal guidance based ONLY on the provided sections
-- Recommend consulting a qualified lawyer for specific legal advice
-- Do NOT make up or assume information not present in the context
-
-Context from Indian Laws (IPC & CrPC):
-{context}"""),
-                ("human", """Previous Conversation:
-{conversation_history}
-
-Current Question: {question}
-
-Answer based ONLY on the legal sections provided in the context above.""")
-            ])
-            
-            messages = prompt.format_messages(
-                context=context,
-                conversation_history=conversation_context,
-                question=question
-            )
-        else:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", """You are an expert Indian legal assistant specializing in the Indian criminal law (IPC and CrPC).
-
-IMPORTANT: You must ONLY answer questions based on the legal sections provided in the context below. Do NOT use external knowledge.
-
-Rules:
-- ONLY cite legal sections that are provided in the context
-- If the provided context doesn't contain information to answer the question, clearly state: "I don't have information about this in the provided legal sections."
-- Always cite specific IPC section numbers and titles from the context
-- Provide clear, accurate legal guidance based ONLY on the provided sections
-- Recommend consulting a qualified lawyer for specific legal advice
-- Do NOT make up or assume information not present in the context
-
-Context from Indian Laws (IPC & CrPC):
-{context}"""),
-                ("human", """Question: {question}
-
-Answer based ONLY on the legal sections provided in the context above.""")
-            ])
-            
-            messages = prompt.format_messages(
-                context=context,
-                question=question
-            )
-        
-        # Stream the response
         full_answer = ""
-        async for chunk in self.llm.astream(messages):
-            if chunk.content:
-                full_answer += chunk.content
+        try:
+            while True:
+                content = await chunks.get()
+                if content is None:
+                    break
+                full_answer += content
                 yield {
                     "type": "content",
-                    "content": chunk.content
+                    "content": content
                 }
+            # Re-raise any error from the LLM stream
+            await producer
+        finally:
+            producer.cancel()
+        
+        if not conversation_context:
+            self._remember_answer(cache_key, full_answer)
+        self._remember_response(response_key, full_answer, retrieved_documents)
         
         # Send completion
         yield {
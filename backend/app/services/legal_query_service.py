@@ -1,6 +1,9 @@
 """Legal query service - handles legal questions and research"""
 
-from typing import Dict, List
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from app.services.base_graph_service import MAX_HISTORY_MESSAGES
 from app.services.vector_store import VectorStoreService
 from app.services.legal_graph import LegalGraphService
 import logging
@@ -11,7 +14,8 @@ logger = logging.getLogger(__name__)
 class LegalQueryService:
     """Service for handling legal queries and research"""
     
-    def __init__(self):
+    def __init__(self, embeddings: Optional[Embeddings] = None):
+        self.embeddings = embeddings
         self.vector_store: VectorStoreService = None
         self.legal_graph: LegalGraphService = None
         self._initialized = False
@@ -25,7 +29,7 @@ class LegalQueryService:
         logger.info("Initializing legal query service...")
         
         # Initialize criminal law vector store
-        self.vector_store = VectorStoreService(domain="criminal")
+        self.vector_store = VectorStoreService(domain="criminal", embeddings=self.embeddings)
         await self.vector_store.initialize(force_reload=force_reload)
         
         # Initialize legal graph
@@ -34,19 +38,24 @@ class LegalQueryService:
         self._initialized = True
         logger.info("Legal query service initialized successfully")
     
+    @staticmethod
+    def _recent_history(chat_history: Optional[List[dict]]) -> Deque[dict]:
+        """Keep only the messages the prompts can use, dropping older turns once"""
+        return deque(chat_history or (), maxlen=MAX_HISTORY_MESSAGES)
+    
     async def query(self, question: str, chat_history: List[dict] = None) -> Dict:
         """Process a legal query"""
         if not self._initialized:
             raise RuntimeError("Legal query service not initialized")
         
-        return self.legal_graph.query(question, chat_history)
+        return await self.legal_graph.query(question, self._recent_history(chat_history))
     
     async def query_stream(self, question: str, chat_history: List[dict] = None):
         """Process a legal query with streaming response"""
         if not self._initialized:
             raise RuntimeError("Legal query service not initialized")
         
-        async for chunk in self.legal_graph.query_stream(question, chat_history):
+        async for chunk in self.legal_graph.query_stream(question, self._recent_history(chat_history)):
             yield chunk
     
     def is_ready(self) -> bool:
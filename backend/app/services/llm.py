@@ -0,0 +1,123 @@
+"""Shared chat model client"""
+
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+from langchain_core.messages import BaseMessage
+from langchain_openai import ChatOpenAI
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS
+    )
+
+
+@lru_cache(maxsize=1)
+def get_llm() -> ChatOpenAI:
+    """Process-wide ChatOpenAI client with pooled keep-alive connections.
+
+    Every graph service shares it, so requests reuse warm TCP/TLS
+    connections instead of each service opening its own pool.
+    """
+    return ChatOpenAI(
+        model=settings.LLM_MODEL,
+        temperature=settings.TEMPERATURE,
+        openai_api_key=settings.OPENAI_API_KEY,
+        extra_body={"prompt_cache_key": settings.PROMPT_CACHE_KEY} if settings.PROMPT_CACHE_KEY else None,
+        timeout=settings.LLM_TIMEOUT,
+        http_client=httpx.Client(limits=_http_limits(), timeout=settings.LLM_TIMEOUT),
+        http_async_client=httpx.AsyncClient(limits=_http_limits(), timeout=settings.LLM_TIMEOUT)
+    )
+
+
+class BatchingLLMQueue:
+    """Micro-batches concurrent non-streaming LLM calls.
+
+    Calls arriving within a short window are dispatched together, and
+    identical prompts to the same model in one window share a single
+    request, so a burst of duplicate questions costs one completion. With a
+    zero window (the default) calls go straight to the model.
+    """
+
+    def __init__(self, window_ms: float = None, max_batch: int = None):
+        self.window = (settings.LLM_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_batch = max_batch or settings.LLM_BATCH_MAX_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Keeps in-flight dispatch tasks referenced until they finish
+        self._dispatches: Set[asyncio.Task] = set()
+
+    async def submit(self, llm: ChatOpenAI, messages: List[BaseMessage]) -> BaseMessage:
+        """Queue a chat call and wait for its response"""
+        if self.window <= 0:
+            return await llm.ainvoke(messages)
+
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((llm, messages, future))
+        return await future
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch without blocking collection of the next batch
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    @staticmethod
+    def _prompt_key(llm: ChatOpenAI, messages: List[BaseMessage]) -> Tuple:
+        return (id(llm),) + tuple((message.type, str(message.content)) for message in messages)
+
+    async def _dispatch(self, batch: List[Tuple[ChatOpenAI, List[BaseMessage], asyncio.Future]]) -> None:
+        prompts: Dict[Tuple, Tuple[ChatOpenAI, List[BaseMessage], List[asyncio.Future]]] = {}
+        for llm, messages, future in batch:
+            key = self._prompt_key(llm, messages)
+            prompts.setdefault(key, (llm, messages, []))[2].append(future)
+
+        if len(prompts) < len(batch):
+            logger.info("LLM batch of %d calls deduplicated to %d requests", len(batch), len(prompts))
+
+        results = await asyncio.gather(
+            *(llm.ainvoke(messages) for llm, messages, _ in prompts.values()),
+            return_exceptions=True
+        )
+        for (_, _, futures), result in zip(prompts.values(), results):
+            for future in futures:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+llm_queue = BatchingLLMQueue()
@@ -0,0 +1,241 @@
+"""Semantic cache: exact-key lookup plus nearest-neighbour lookup on embeddings"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+_NUMBER_RE = re.compile(r"\d+")
+
+# SimHash near-duplicate matching: 64-bit fingerprints split into bands so that
+# any two fingerprints within the distance share at least one band exactly
+_SIMHASH_BITS = 64
+_SIMHASH_MAX_DISTANCE = 3
+_SIMHASH_BANDS = _SIMHASH_MAX_DISTANCE + 1
+_SIMHASH_BAND_BITS = _SIMHASH_BITS // _SIMHASH_BANDS
+_SIMHASH_BAND_MASK = (1 << _SIMHASH_BAND_BITS) - 1
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants share a key"""
+    return _WHITESPACE_RE.sub(" ", _PUNCTUATION_RE.sub(" ", question)).strip().lower()
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over the word unigrams and bigrams of normalized text"""
+    words = text.split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    weights = [0] * _SIMHASH_BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(_SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def question_key(question: str) -> str:
+    """SHA-256 key of the normalized question"""
+    return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+
+def unit_vector(vector) -> np.ndarray:
+    """Convert an embedding to a unit-length float32 array"""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Bounded LRU + TTL cache with cosine-similarity lookup.
+
+    Embeddings live in a preallocated matrix with one row per slot, so a
+    similarity probe is a single matrix-vector product. Instances are shared
+    across worker threads, so every public method runs under one lock.
+    """
+
+    def __init__(self, capacity: int = None, threshold: float = None, ttl: Optional[float] = None):
+        self.capacity = capacity or settings.SEMANTIC_CACHE_SIZE
+        self.threshold = threshold if threshold is not None else settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl = ttl
+
+        # key -> (slot, expires_at, value), ordered least recently used first
+        self._entries: "OrderedDict[str, Tuple[Optional[int], Optional[float], Any]]" = OrderedDict()
+        # Allocated on first insert, once the embedding dimension is known
+        self._matrix: Optional[np.ndarray] = None
+        self._slot_used = np.zeros(self.capacity, dtype=bool)
+        self._slot_keys: List[Optional[str]] = [None] * self.capacity
+        # Near-duplicate index: key -> (simhash, numbers) and (band, value) -> keys
+        self._fingerprints: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+        self._bands: Dict[Tuple[int, int], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Exact-key lookup"""
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry):
+            self._release(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def get_fuzzy(self, text: str) -> Tuple[Optional[str], Optional[Any]]:
+        """Near-duplicate lookup by SimHash of the normalized text, as ``(key, value)``.
+        
+        Only entries mentioning exactly the same numbers can match, so
+        "section 302" never lands on "section 303".
+        """
+        if not self._fingerprints:
+            return None, None
+
+        normalized = normalize_question(text)
+        fingerprint = simhash(normalized)
+        numbers = tuple(_NUMBER_RE.findall(normalized))
+
+        with self._lock:
+            candidates = set()
+            for band in range(_SIMHASH_BANDS):
+                candidates.update(self._bands.get(self._band(fingerprint, band), ()))
+
+            for key in candidates:
+                other, other_numbers = self._fingerprints[key]
+                if other_numbers == numbers and bin(fingerprint ^ other).count("1") <= _SIMHASH_MAX_DISTANCE:
+                    value = self._get(key)
+                    return (key, value) if value is not None else (None, None)
+        return None, None
+
+    def get_similar(self, vector: np.ndarray) -> Tuple[Optional[str], Optional[Any], float]:
+        """Return ``(key, value, score)`` of the most similar entry above the threshold"""
+        with self._lock:
+            if vector is None or self._matrix is None or not self._slot_used.any():
+                return None, None, 0.0
+
+            scores = self._matrix @ vector
+            scores[~self._slot_used] = -1.0
+            slot = int(np.argmax(scores))
+            score = float(scores[slot])
+            if score < self.threshold:
+                return None, None, score
+
+            key = self._slot_keys[slot]
+            value = self._get(key)
+            return (key, value, score) if value is not None else (None, None, score)
+
+    def put(self, key: str, vector: Optional[np.ndarray], value: Any, text: str = None) -> None:
+        """Insert or refresh an entry, evicting the least recently used one if full.
+        
+        Passing the original ``text`` also indexes the entry for :meth:`get_fuzzy`.
+        """
+        fingerprint = numbers = None
+        if text is not None:
+            normalized = normalize_question(text)
+            fingerprint = simhash(normalized)
+            numbers = tuple(_NUMBER_RE.findall(normalized))
+
+        with self._lock:
+            if key in self._entries:
+                self._release(key)
+            elif len(self._entries) >= self.capacity:
+                self._release(next(iter(self._entries)))
+
+            slot = None
+            if vector is not None:
+                if self._matrix is None:
+                    self._matrix = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+                slot = int(np.argmin(self._slot_used))
+                self._matrix[slot] = vector
+                self._slot_used[slot] = True
+                self._slot_keys[slot] = key
+
+            if fingerprint is not None:
+                self._fingerprints[key] = (fingerprint, numbers)
+                for band in range(_SIMHASH_BANDS):
+                    self._bands.setdefault(self._band(fingerprint, band), set()).add(key)
+
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = (slot, expires_at, value)
+
+    def update(self, key: str, value: Any) -> bool:
+        """Replace the value of an existing entry, keeping its embedding"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            self._entries[key] = (entry[0], entry[1], value)
+            return True
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._slot_used[:] = False
+            self._slot_keys = [None] * self.capacity
+            self._fingerprints.clear()
+            self._bands.clear()
+
+    @staticmethod
+    def _band(fingerprint: int, band: int) -> Tuple[int, int]:
+        return band, fingerprint >> (band * _SIMHASH_BAND_BITS) & _SIMHASH_BAND_MASK
+
+    def _expired(self, entry: Tuple[Optional[int], Optional[float], Any]) -> bool:
+        return entry[1] is not None and entry[1] < time.monotonic()
+
+    def _release(self, key: str) -> None:
+        """Remove an entry and free its embedding slot; the caller holds the lock"""
+        slot, _, _ = self._entries.pop(key)
+        if slot is not None:
+            self._slot_used[slot] = False
+            self._slot_keys[slot] = None
+
+        fingerprint = self._fingerprints.pop(key, None)
+        if fingerprint is not None:
+            for band in range(_SIMHASH_BANDS):
+                band_key = self._band(fingerprint[0], band)
+                keys = self._bands[band_key]
+                keys.discard(key)
+                if not keys:
+                    del self._bands[band_key]
+
+
+# One retrieval and one response cache per vector-store domain, shared by
+# every graph service instance
+_retrieval_caches: Dict[str, SemanticCache] = {}
+_response_caches: Dict[str, SemanticCache] = {}
+
+
+def get_retrieval_cache(domain: str) -> SemanticCache:
+    """Get the shared retrieval cache for a vector-store domain"""
+    cache = _retrieval_caches.get(domain)
+    if cache is None:
+        cache = _retrieval_caches[domain] = SemanticCache(ttl=settings.SEMANTIC_CACHE_TTL)
+    return cache
+
+
+def get_response_cache(domain: str) -> SemanticCache:
+    """Get the shared exact (question, history) -> response cache for a domain"""
+    cache = _response_caches.get(domain)
+    if cache is None:
+        cache = _response_caches[domain] = SemanticCache(ttl=settings.SEMANTIC_CACHE_TTL)
+    return cache
+
+
+def clear_retrieval_caches() -> None:
+    """Invalidate every retrieval and response cache (e.g. after documents are reloaded)"""
+    for cache in (*_retrieval_caches.values(), *_response_caches.values()):
+        cache.clear()
@@ -1,41 +1,208 @@
 """Vector store service"""
 
+import asyncio
 import os
-from typing import List, Optional, Dict
-from langchain_openai import OpenAIEmbeddings
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Tuple
+import faiss
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_core.documents import Document
 from app.core.config import settings
+from app.services.embedding_cache import CachedEmbedder, get_embeddings
+from app.services.faiss_index import build_index
 import logging
 
 logger = logging.getLogger(__name__)
 
+# FAISS searches get their own threads so they never queue behind blocking
+# I/O on the default executor. Each thread runs single-threaded OpenMP (the
+# setting is per calling thread), so concurrent searches spread across cores
+# instead of oversubscribing them; index builds keep every core.
+FAISS_POOL = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 4,
+    thread_name_prefix="faiss",
+    initializer=faiss.omp_set_num_threads,
+    initargs=(1,)
+)
+
+# Keyword patterns checked in order; the first match decides the domain.
+# Only the start of a word is anchored so plurals and inflections still match.
+_DOMAIN_PATTERNS = [
+    ("nda_unilateral", re.compile(
+        r"\b(?:unilateral|one-way|recipient|disclosing party only|company discloses|recipient obligations)",
+        re.IGNORECASE
+    )),
+    ("nda_mutual", re.compile(r"\b(?:mutual|bilateral|both parties|two-way)", re.IGNORECASE)),
+    ("nda", re.compile(
+        r"\b(?:nda|confidential|non-disclosure|contract|agreement|clause|disclosure)",
+        re.IGNORECASE
+    )),
+    ("criminal", re.compile(
+        r"\b(?:ipc|crpc|criminal|penal|section|offence|punishment|bail|arrest|charge|trial)",
+        re.IGNORECASE
+    )),
+]
+
+
+def search_matrix(store: FAISS, vectors, k: int, with_ids: bool = False) -> List[List]:
+    """Top-k documents for each query vector, in one FAISS call for all of them.
+    
+    With ``with_ids`` each row holds ``(docstore_id, document)`` pairs instead.
+    """
+    # Unit rows keep the ranking under both L2 and inner-product indexes
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    faiss.normalize_L2(matrix)
+    _, indices = store.index.search(matrix, k)
+    rows = [[store.index_to_docstore_id[i] for i in row if i != -1] for row in indices]
+    if with_ids:
+        return [[(id_, store.docstore.search(id_)) for id_ in row] for row in rows]
+    return [[store.docstore.search(id_) for id_ in row] for row in rows]
+
 
 class VectorStoreService:
     """Service for managing FAISS vector stores (supports multiple domains)"""
     
-    def __init__(self, domain: str = "criminal"):
-        self.embeddings = OpenAIEmbeddings(
-            model=settings.EMBEDDING_MODEL,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
+    # Stores loaded by path for cross-domain searches, shared process-wide;
+    # keyed by file version so a rebuilt index is picked up
+    _MAX_LOADED_STORES = 4
+    _loaded_stores: "OrderedDict[Tuple[str, str], FAISS]" = OrderedDict()
+    _loaded_lock = threading.Lock()
+    
+    def __init__(self, domain: str = "criminal", embeddings: Optional[Embeddings] = None):
+        # Shared client unless a caller supplies its own
+        self.embeddings = embeddings or get_embeddings()
         self.vector_store: Optional[FAISS] = None
+        # Identifies the loaded corpus; changes whenever the index is rebuilt or reloaded
+        self.corpus_version = ""
         self.domain = domain
         # Get store path from domain mapping, fallback to default
         self.store_path = settings.VECTOR_STORES.get(domain, settings.VECTOR_STORE_PATH)
     
-    def create_vector_store(self, documents: List[Document]) -> FAISS:
-        """Create vector store from documents"""
-        logger.info(f"Creating vector store from {len(documents)} documents...")
+    def create_vector_store(self, documents: List[Document], batch_size: int = None) -> FAISS:
+        """Create vector store from documents, embedding them in batched requests"""
+        logger.info("Creating vector store from %d documents...", len(documents))
+        
+        texts, batches = self._embedding_batches(documents, batch_size)
+        unique_vectors = []
+        for batch in batches:
+            unique_vectors.extend(self._embed_batch(batch))
+        
+        return self._store_from_vectors(documents, texts, unique_vectors)
+    
+    async def acreate_vector_store(self, documents: List[Document], batch_size: int = None,
+                                   concurrency: int = None) -> FAISS:
+        """Like create_vector_store, with up to ``concurrency`` embedding requests in flight"""
+        logger.info("Creating vector store from %d documents...", len(documents))
+        
+        texts, batches = self._embedding_batches(documents, batch_size)
+        semaphore = asyncio.Semaphore(concurrency or settings.EMBED_CONCURRENCY)
+        
+        async def embed(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                try:
+                    return await self.embeddings.aembed_documents(batch)
+                except (RuntimeError, MemoryError) as e:
+                    if len(batch) == 1:
+                        raise
+                    logger.warning("Embedding batch of %d failed (%s), retrying one at a time", len(batch), e)
+                    return [(await self.embeddings.aembed_documents([text]))[0] for text in batch]
+        
+        results = await asyncio.gather(*(embed(batch) for batch in batches))
+        unique_vectors = [vector for result in results for vector in result]
+        return self._store_from_vectors(documents, texts, unique_vectors)
+    
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        """Embed one batch, falling back to one text at a time if the model runs out of memory"""
+        try:
+            return self.embeddings.embed_documents(batch)
+        except (RuntimeError, MemoryError) as e:
+            if len(batch) == 1:
+                raise
+            logger.warning("Embedding batch of %d failed (%s), retrying one at a time", len(batch), e)
+            return [self.embeddings.embed_documents([text])[0] for text in batch]
+    
+    @staticmethod
+    def _embedding_batches(documents: List[Document], batch_size: int = None,
+                           max_chars: int = None) -> Tuple[List[str], List[List[str]]]:
+        """Document texts, and their unique values split into batches capped by count and total length"""
+        batch_size = min(batch_size or settings.EMBEDDING_BATCH_SIZE, 2048)
+        max_chars = max_chars or settings.EMBEDDING_BATCH_CHARS
+        texts = [doc.page_content for doc in documents]
+        
+        # Identical chunks (repeated boilerplate, overlapping splits) are embedded once
+        unique_texts = list(dict.fromkeys(texts))
+        if len(unique_texts) < len(texts):
+            logger.info("Embedding %d unique chunks out of %d", len(unique_texts), len(texts))
+        
+        batches, batch, chars = [], [], 0
+        for text in unique_texts:
+            if batch and (len(batch) >= batch_size or chars + len(text) > max_chars):
+                batches.append(batch)
+                batch, chars = [], 0
+            batch.append(text)
+            chars += len(text)
+        if batch:
+            batches.append(batch)
+        return texts, batches
+    
+    def _store_from_vectors(self, documents: List[Document], texts: List[str], unique_vectors: List) -> FAISS:
+        """Index the documents given the vectors of their unique texts, in first-seen order"""
+        metadatas = [doc.metadata for doc in documents]
+        vector_by_text = dict(zip(dict.fromkeys(texts), unique_vectors))
         
-        self.vector_store = FAISS.from_documents(
-            documents=documents,
-            embedding=self.embeddings
+        # Unit-length vectors make inner product equal cosine similarity. They are
+        # normalized once here; LangChain's normalize_L2 is left off because it
+        # conflicts with MAX_INNER_PRODUCT scoring
+        vectors = np.asarray([vector_by_text[text] for text in texts], dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        ids = [str(uuid.uuid4()) for _ in texts]
+        self.vector_store = FAISS(
+            embedding_function=self.embeddings,
+            index=self._build_index(vectors),
+            docstore=InMemoryDocstore({
+                id_: Document(page_content=text, metadata=metadata)
+                for id_, text, metadata in zip(ids, texts, metadatas)
+            }),
+            index_to_docstore_id=dict(enumerate(ids)),
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
         )
         
+        self.corpus_version = f"built-{time.time_ns()}"
         logger.info("Vector store created successfully")
         return self.vector_store
     
+    @staticmethod
+    def _build_index(vectors: np.ndarray) -> faiss.Index:
+        """Inner-product index over unit vectors, so scores are cosine similarities"""
+        return build_index(
+            vectors,
+            faiss.METRIC_INNER_PRODUCT,
+            hnsw_min_vectors=settings.HNSW_MIN_VECTORS,
+            hnsw_m=settings.HNSW_M,
+            ef_construction=settings.HNSW_EF_CONSTRUCTION,
+            ef_search=settings.HNSW_EF_SEARCH,
+            quantize=settings.USE_QUANTIZATION
+        )
+    
+    @staticmethod
+    def _file_version(path: str) -> str:
+        """Version string derived from the index files, identical across workers"""
+        stats = [
+            os.stat(os.path.join(path, name))
+            for name in sorted(os.listdir(path))
+            if name.startswith("index.")
+        ]
+        return "-".join(f"{stat.st_mtime_ns}:{stat.st_size}" for stat in stats)
+    
     def save_vector_store(self) -> None:
         """Save vector store to disk"""
         if self.vector_store is None:
@@ -43,14 +210,14 @@ class VectorStoreService:
         
         os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
         self.vector_store.save_local(self.store_path)
-        logger.info(f"Vector store saved to {self.store_path}")
+        logger.info("Vector store saved to %s", self.store_path)
     
     def load_vector_store(self, store_path: str = None) -> Optional[FAISS]:
         """Load vector store from disk (optionally specify path)"""
         path = store_path or self.store_path
         
         if not os.path.exists(path):
-            logger.warning(f"Vector store not found at {path}")
+            logger.warning("Vector store not found at %s", path)
             return None
         
         try:
@@ -59,27 +226,88 @@ class VectorStoreService:
                 self.embeddings,
                 allow_dangerous_deserialization=True
             )
+            # Stores built before the switch to cosine similarity still use L2
+            if loaded_store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+                loaded_store.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+            if isinstance(loaded_store.index, faiss.IndexHNSW):
+                loaded_store.index.hnsw.efSearch = settings.HNSW_EF_SEARCH
             
             # Only update instance store if using default path
             if store_path is None:
                 self.vector_store = loaded_store
+                self.corpus_version = self._file_version(path)
             
-            logger.info(f"Vector store loaded successfully from {path}")
+            logger.info("Vector store loaded successfully from %s", path)
             return loaded_store
         except Exception as e:
-            logger.error(f"Error loading vector store: {str(e)}")
+            logger.error("Error loading vector store: %s", e)
             return None
     
+    def _get_store(self, path: str) -> Optional[FAISS]:
+        """Load a store by path, reusing one already loaded from the same files"""
+        if not os.path.exists(path):
+            return self.load_vector_store(path)
+        
+        key = (path, self._file_version(path))
+        with self._loaded_lock:
+            store = self._loaded_stores.get(key)
+            if store is not None:
+                self._loaded_stores.move_to_end(key)
+                return store
+        
+        store = self.load_vector_store(path)
+        if store is not None:
+            with self._loaded_lock:
+                self._loaded_stores[key] = store
+                while len(self._loaded_stores) > self._MAX_LOADED_STORES:
+                    self._loaded_stores.popitem(last=False)
+        return store
+    
     def switch_domain(self, domain: str) -> bool:
         """Switch to a different domain's vector store"""
         if domain not in settings.VECTOR_STORES:
-            logger.error(f"Unknown domain: {domain}")
+            logger.error("Unknown domain: %s", domain)
             return False
         
         self.domain = domain
         self.store_path = settings.VECTOR_STORES[domain]
         return self.load_vector_store() is not None
     
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a query as a float32 vector"""
+        if isinstance(self.embeddings, CachedEmbedder):
+            return self.embeddings.embed(text)
+        return np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+    
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed several queries in one request as a float32 matrix"""
+        if isinstance(self.embeddings, CachedEmbedder):
+            return np.stack(self.embeddings.embed_batch(texts))
+        return np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+    
+    def similarity_search_by_vector(self, vector: np.ndarray, k: int = None) -> List[Document]:
+        """Search for documents similar to an already computed query embedding"""
+        if self.vector_store is None:
+            logger.info("No vector store available - returning empty results")
+            return []
+        
+        k = k or settings.TOP_K_RESULTS
+        return self.vector_store.similarity_search_by_vector(self._query_vector(vector), k=k)
+    
+    def similarity_search_batch(self, queries: List[str], k: int = None) -> List[List[Document]]:
+        """Search several queries with one embedding request and one FAISS call"""
+        if self.vector_store is None or not queries:
+            return [[] for _ in queries]
+        
+        k = k or settings.TOP_K_RESULTS
+        return search_matrix(self.vector_store, self.embed_batch(queries), k)
+    
+    @staticmethod
+    def _query_vector(vector: np.ndarray) -> List[float]:
+        """Normalize a query embedding; keeps the ranking under both L2 and inner product"""
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+    
     def similarity_search(self, query: str, k: int = None) -> List[Document]:
         """Search for similar documents"""
         if self.vector_store is None:
@@ -91,50 +319,40 @@ class VectorStoreService:
         return results
     
     def search_multiple_stores(self, query: str, domains: List[str], k: int = None) -> Dict[str, List[Document]]:
-        """Search across multiple domain stores"""
+        """Search across multiple domain stores concurrently"""
         k = k or settings.TOP_K_RESULTS
-        results = {}
+        domains = [domain for domain in dict.fromkeys(domains) if domain in settings.VECTOR_STORES]
+        if not domains:
+            return {}
+        
+        # Embed once; FAISS releases the GIL, so the per-store searches run in parallel
+        vector = self._query_vector(self.embed(query))
+        futures = {
+            domain: FAISS_POOL.submit(self._search_store, settings.VECTOR_STORES[domain], vector, k)
+            for domain in domains
+        }
         
-        for domain in domains:
-            if domain in settings.VECTOR_STORES:
-                store = self.load_vector_store(settings.VECTOR_STORES[domain])
-                if store:
-                    results[domain] = store.similarity_search(query, k=k)
-                    logger.info(f"Found {len(results[domain])} results in {domain} domain")
+        results = {}
+        for domain, future in futures.items():
+            documents = future.result()
+            if documents is not None:
+                results[domain] = documents
+                logger.info("Found %d results in %s domain", len(documents), domain)
         
         return results
     
+    def _search_store(self, path: str, vector: List[float], k: int) -> Optional[List[Document]]:
+        store = self._get_store(path)
+        if store is None:
+            return None
+        return store.similarity_search_by_vector(vector, k=k)
+    
     @staticmethod
     def detect_domain(query: str) -> str:
         """Detect the appropriate domain from query keywords"""
-        query_lower = query.lower()
-        
-        # Unilateral NDA keywords
-        if any(word in query_lower for word in [
-            "unilateral", "one-way", "recipient", "disclosing party only",
-            "company discloses", "recipient obligations"
-        ]):
-            return "nda_unilateral"
-        
-        # Mutual NDA keywords
-        if any(word in query_lower for word in [
-            "mutual", "bilateral", "both parties", "two-way"
-        ]):
-            return "nda_mutual"
-        
-        # General Contract/NDA keywords (default to mutual)
-        if any(word in query_lower for word in [
-            "nda", "confidential", "non-disclosure", "contract", "agreement",
-            "clause", "confidentiality", "disclosure"
-        ]):
-            return "nda"
-        
-        # Criminal law keywords (default)
-        if any(word in query_lower for word in [
-            "ipc", "crpc", "criminal", "penal", "section", "offence", 
-            "punishment", "bail", "arrest", "charge", "trial"
-        ]):
-            return "criminal"
+        for domain, pattern in _DOMAIN_PATTERNS:
+            if pattern.search(query):
+                return domain
         
         # Default to criminal (most common use case)
         return "criminal"
@@ -144,7 +362,8 @@ class VectorStoreService:
         
         # Try to load vector store if it exists, but don't fail if it doesn't
         if os.path.exists(self.store_path):
-            if self.load_vector_store():
+            # Load off the event loop so several stores can load concurrently
+            if await asyncio.to_thread(self.load_vector_store):
                 logger.info("Vector store initialized (loaded from disk)")
             else:
                 logger.warning("Vector store exists but failed to load")
@@ -29,8 +29,31 @@ CHUNK_OVERLAP = 200
 
 # Model Configuration
 EMBEDDING_MODEL = "text-embedding-3-small"
-LLM_MODEL = "gpt-4-turbo-preview"
-TEMPERATURE = 0.1
+# Texts per embedding request; OpenAI accepts at most 2048
+EMBED_CHUNK_SIZE = int(os.getenv("EMBED_CHUNK_SIZE", "1000"))
+# Document embeddings cached by content hash, shared with the IPC build script
+EMBED_CACHE_DIR = "./data/.embed_cache"
+# The chat model (LLM_MODEL, TEMPERATURE, connection pool) comes from the app
+# settings via app.services.llm.get_llm
 
 # Retrieval Configuration
 TOP_K_RESULTS = 5
+# Window for stacking concurrent vector searches into one FAISS call. Opt-in:
+# every search waits up to the window, so 0 searches at once
+SEARCH_BATCH_WINDOW_MS = float(os.getenv("SEARCH_BATCH_WINDOW_MS", "0"))
+SEARCH_BATCH_MAX_SIZE = 32
+
+# Stores with at least this many vectors use an HNSW graph instead of a flat scan
+HNSW_MIN_VECTORS = 10000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+# 8-bit scalar-quantized index (see app.services.faiss_index.build_index)
+USE_QUANTIZATION = os.getenv("USE_QUANTIZATION", "").lower() in ("1", "true", "yes")
+# Memory-map saved indexes: pages load on demand and are shared between processes
+MMAP_VECTOR_STORE = os.getenv("MMAP_VECTOR_STORE", "true").lower() in ("1", "true", "yes")
+
+# Semantic response cache: answers reused for paraphrased questions
+SEMANTIC_CACHE_SIZE = 1024
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_TTL = 24 * 60 * 60  # 1 day
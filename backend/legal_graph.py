@@ -1,12 +1,16 @@
 """LangGraph workflow for legal assistant RAG"""
 
-from typing import TypedDict, List, Annotated
+import asyncio
+import hashlib
+from typing import Any, TypedDict, List, Annotated, Optional
 from langgraph.graph import StateGraph, END
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage, AIMessage
-from vector_store import VectorStoreManager
-from config import LLM_MODEL, OPENAI_API_KEY, TOP_K_RESULTS, TEMPERATURE
+from vector_store import SearchBatcher, VectorStoreManager
+from config import TOP_K_RESULTS, SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL
+from app.services.llm import get_llm
+from app.services.semantic_cache import SemanticCache, question_key, unit_vector
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -21,43 +25,26 @@ class GraphState(TypedDict):
     context: str
     answer: str
     chat_history: List[dict]
+    context_key: str
+    query_vector: Optional[Any]
 
 
 class LegalAssistantGraph:
     """LangGraph workflow for legal question answering"""
     
-    def __init__(self, vector_store_manager: VectorStoreManager):
+    def __init__(self, vector_store_manager: VectorStoreManager, llm: Optional[ChatOpenAI] = None):
         self.vector_store = vector_store_manager
-        self.llm = ChatOpenAI(
-            model=LLM_MODEL,
-            temperature=TEMPERATURE,
-            openai_api_key=OPENAI_API_KEY
+        self.llm = llm or get_llm()
+        # Answers keyed by question, also matched by embedding similarity
+        self.response_cache = SemanticCache(
+            capacity=SEMANTIC_CACHE_SIZE,
+            threshold=SEMANTIC_CACHE_THRESHOLD,
+            ttl=SEMANTIC_CACHE_TTL
         )
-        self.graph = self._build_graph()
-    
-    def _retrieve(self, state: GraphState) -> GraphState:
-        """Retrieve relevant documents"""
-        logger.info(f"Retrieving documents for: {state['question']}")
-        
-        results = self.vector_store.similarity_search(
-            state['question'],
-            k=TOP_K_RESULTS
-        )
-        
-        state['retrieved_documents'] = [doc.page_content for doc in results]
-        state['context'] = "\n\n---\n\n".join([
-            f"Source: {doc.metadata.get('act_name', 'Unknown')}\n{doc.page_content}"
-            for doc in results
-        ])
-        
-        logger.info(f"Retrieved {len(results)} documents")
-        return state
-    
-    def _generate(self, state: GraphState) -> GraphState:
-        """Generate answer based on retrieved context"""
-        logger.info("Generating answer...")
-        
-        prompt = ChatPromptTemplate.from_messages([
+        # Concurrent requests share one batched FAISS search
+        self._search_batcher = SearchBatcher(vector_store_manager)
+        # Parsed once; only formatted per request
+        self._prompt = ChatPromptTemplate.from_messages([
             ("system", """You are an expert Indian legal assistant with deep knowledge of Indian laws including the Information Technology Act and Indian Penal Code.
 
 Your role is to:
@@ -75,18 +62,66 @@ Question: {question}
 
 Please provide a comprehensive answer based on the legal context above. Include relevant section numbers and provisions where applicable.""")
         ])
+        self.graph = self._build_graph()
+    
+    async def _retrieve(self, state: GraphState) -> GraphState:
+        """Retrieve relevant documents"""
+        logger.info(f"Retrieving documents for: {state['question']}")
         
-        messages = prompt.format_messages(
+        # Embedding blocks, so keep it off the event loop; reuse the cache lookup's vector
+        vector = state.get('query_vector')
+        if vector is None:
+            vector = await asyncio.to_thread(self.vector_store.embeddings.embed_query, state['question'])
+        hits = await self._search_batcher.search(vector, TOP_K_RESULTS)
+        results = [doc for _, doc in hits]
+        
+        state['retrieved_documents'] = [doc.page_content for doc in results]
+        
+        # Questions that retrieve the same documents get the same context (in a
+        # fixed order) and one provider prompt-cache key, taken from the
+        # docstore IDs rather than the text
+        blocks = sorted(
+            f"Source: {doc.metadata.get('act_name', 'Unknown')}\n{doc.page_content}"
+            for doc in results
+        )
+        doc_ids = sorted(id_ for id_, _ in hits)
+        state['context'] = "\n\n---\n\n".join(blocks)
+        state['context_key'] = hashlib.blake2b("\0".join(doc_ids).encode("utf-8"), digest_size=16).hexdigest()
+        
+        logger.info(f"Retrieved {len(results)} documents")
+        return state
+    
+    async def _generate(self, state: GraphState) -> GraphState:
+        """Generate answer based on retrieved context"""
+        logger.info("Generating answer...")
+        
+        messages = self._prompt.format_messages(
             context=state['context'],
             question=state['question']
         )
         
-        response = self.llm.invoke(messages)
+        response = await self._llm_for(state).ainvoke(messages)
         state['answer'] = response.content
         
         logger.info("Answer generated")
         return state
     
+    def _llm_for(self, state: GraphState):
+        """Chat model routed to the provider prompt cache for this context"""
+        return self.llm.bind(extra_body={"prompt_cache_key": state['context_key']})
+    
+    @staticmethod
+    def _initial_state(question: str, chat_history: List[dict] = None) -> GraphState:
+        return {
+            "question": question,
+            "retrieved_documents": [],
+            "context": "",
+            "answer": "",
+            "chat_history": chat_history or [],
+            "context_key": "",
+            "query_vector": None
+        }
+    
     def _build_graph(self) -> StateGraph:
         """Build the LangGraph workflow"""
         workflow = StateGraph(GraphState)
@@ -102,23 +137,57 @@ Please provide a comprehensive answer based on the legal context above. Include
         
         return workflow.compile()
     
-    def query(self, question: str, chat_history: List[dict] = None) -> dict:
-        """Query the legal assistant"""
-        initial_state = {
-            "question": question,
-            "retrieved_documents": [],
-            "context": "",
-            "answer": "",
-            "chat_history": chat_history or []
-        }
+    async def aquery(self, question: str, chat_history: List[dict] = None) -> dict:
+        """Query the legal assistant without blocking the event loop"""
+        key = question_key(question)
+        cached = self.response_cache.get(key)
+        embedding = None
+        if cached is None:
+            embedding = unit_vector(await asyncio.to_thread(self.vector_store.embeddings.embed_query, question))
+            _, cached, score = self.response_cache.get_similar(embedding)
+            if cached is not None:
+                logger.info(f"Response cache hit (score={score:.3f})")
+        if cached is not None:
+            return {"question": question, **cached}
         
-        result = self.graph.invoke(initial_state)
+        initial_state = self._initial_state(question, chat_history)
+        initial_state['query_vector'] = embedding
         
-        return {
-            "question": result["question"],
-            "answer": result["answer"],
-            "sources": result["retrieved_documents"]
-        }
+        # Straight-line retrieve -> generate; the compiled graph only adds
+        # orchestration overhead for a two-node pipeline
+        result = await self._retrieve(initial_state)
+        result = await self._generate(result)
+        
+        response = {"answer": result["answer"], "sources": result["retrieved_documents"]}
+        self.response_cache.put(key, embedding, response)
+        
+        return {"question": result["question"], **response}
+    
+    async def astream_answer(self, question: str):
+        """Retrieve, then stream the answer as ``sources``/``content``/``done`` events"""
+        state = await self._retrieve(self._initial_state(question))
+        yield {"type": "sources", "sources": state["retrieved_documents"]}
+        
+        messages = self._prompt.format_messages(
+            context=state['context'],
+            question=question
+        )
+        
+        answer = ""
+        async for chunk in self._llm_for(state).astream(messages):
+            if chunk.content:
+                answer += chunk.content
+                yield {"type": "content", "content": chunk.content}
+        
+        yield {"type": "done", "question": question, "answer": answer}
+    
+    def query(self, question: str, chat_history: List[dict] = None) -> dict:
+        """Query the legal assistant (blocking, for scripts without an event loop)"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.aquery(question, chat_history))
+        raise RuntimeError("LegalAssistantGraph.query() cannot run inside an event loop; await aquery() instead")
 
 
 if __name__ == "__main__":
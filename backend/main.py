@@ -8,9 +8,10 @@ FastAPI server for LawAI Legal Assistant
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+import json
 import logging
+from app.models.schemas import QueryRequest, QueryResponse, HealthResponse
 from legal_graph import LegalAssistantGraph
 from vector_store import initialize_vector_store
 
@@ -44,26 +45,6 @@ vector_store_manager = None
 legal_assistant = None
 
 
-class QueryRequest(BaseModel):
-    """Request model for legal queries"""
-    question: str
-    chat_history: Optional[List[dict]] = None
-
-
-class QueryResponse(BaseModel):
-    """Response model for legal queries"""
-    question: str
-    answer: str
-    sources: List[str]
-    success: bool = True
-
-
-class HealthResponse(BaseModel):
-    """Health check response"""
-    status: str
-    vector_store_loaded: bool
-
-
 @app.on_event("startup")
 async def startup_event():
     """Initialize the application on startup"""
@@ -106,7 +87,7 @@ async def query_legal_assistant(request: QueryRequest):
         
         logger.info(f"Processing query: {request.question}")
         
-        result = legal_assistant.query(
+        result = await legal_assistant.aquery(
             question=request.question,
             chat_history=request.chat_history
         )
@@ -126,6 +107,32 @@ async def query_legal_assistant(request: QueryRequest):
         )
 
 
+@app.post("/query/stream")
+async def query_legal_assistant_stream(request: QueryRequest):
+    """Query the legal assistant, streaming answer tokens as server-sent events"""
+    if legal_assistant is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Legal assistant not initialized"
+        )
+    
+    logger.info(f"Processing streaming query: {request.question}")
+    
+    async def generate():
+        try:
+            async for event in legal_assistant.astream_answer(request.question):
+                yield f"data: {json.dumps(event)}\n\n"
+        except Exception as e:
+            logger.error(f"Error in streaming: {str(e)}")
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/reload-documents")
 async def reload_documents():
     """Reload legal documents and rebuild vector store"""
@@ -16,5 +16,6 @@ if __name__ == "__main__":
         "main_modular:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=settings.RELOAD
+        reload=settings.RELOAD and settings.WORKERS == 1,
+        workers=settings.WORKERS
     )
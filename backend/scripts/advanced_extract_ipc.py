@@ -5,9 +5,9 @@ Uses LangChain and OpenAI to intelligently extract and structure IPC sections
 
 import re
 import json
+import hashlib
 from pathlib import Path
 from typing import List, Dict, Optional
-import PyPDF2
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 
@@ -16,6 +16,30 @@ load_dotenv()
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
+from pdf_text import collapse_whitespace, iter_pdf_pages
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Split points: a newline followed by "420." or "Section 420"
+_SECTION_SPLIT_RE = re.compile(r'\n(?=\d+[A-Z]?\.|\bSection\s+\d+[A-Z]?\b)')
+
+# Section header patterns, tried in order
+_SECTION_PATTERNS = [
+    # Pattern 1: "Section 420. Title.—Text"
+    re.compile(r'^(?:Section\s+)?(\d+[A-Z]?)\.\s*([^.—\-–]+?)\.?\s*[—\-–]\s*(.*)', re.DOTALL | re.IGNORECASE),
+    # Pattern 2: "420. Title—Text"
+    re.compile(r'^(\d+[A-Z]?)\.\s*([^.—\-–]+?)\s*[—\-–]\s*(.*)', re.DOTALL | re.IGNORECASE),
+    # Pattern 3: "Section 420: Title - Text"
+    re.compile(r'^(?:Section\s+)?(\d+[A-Z]?)[:\.]\s*([^:—\-–]+?)\s*[:\-–—]\s*(.*)', re.DOTALL | re.IGNORECASE),
+]
+
+# Concurrent requests when falling back to the LLM parser
+LLM_MAX_CONCURRENCY = 32
+
+_PUNISHMENT_RE = re.compile(r'(?:shall be punished|punishment|imprisonment|fine).*?(?:\.|$)', re.IGNORECASE)
 
 
 class IPCSection(BaseModel):
@@ -39,29 +63,29 @@ class AdvancedIPCExtractor:
         if use_llm:
             self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
             self.parser = PydanticOutputParser(pydantic_object=IPCSection)
+            self.prompt = ChatPromptTemplate.from_messages([
+                ("system", """You are an expert at extracting structured information from Indian legal documents.
+Extract the section number, title, and complete text from the given IPC section.
+
+{format_instructions}
+
+Only extract if this appears to be a valid IPC section. If not, return null."""),
+                ("human", "{text}")
+            ])
+            self.format_instructions = self.parser.get_format_instructions()
     
     def extract_text_from_pdf(self) -> str:
         """Extract raw text from PDF"""
         print(f"📖 Extracting text from {self.pdf_path}...")
         
-        text = ""
         try:
-            with open(self.pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                print(f"Total pages: {total_pages}")
-                
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    if page_num % 10 == 0:
-                        print(f"Processing page {page_num}/{total_pages}...")
-                    page_text = page.extract_text()
-                    text += page_text + "\n"
-                    
+            pages = list(iter_pdf_pages(self.pdf_path))
         except Exception as e:
             print(f"❌ Error extracting PDF: {e}")
             raise
-            
-        print(f"✅ Extracted {len(text)} characters from {total_pages} pages")
+        
+        text = "\n".join(pages) + "\n"
+        print(f"✅ Extracted {len(text)} characters from {len(pages)} pages")
         return text
     
     def chunk_text_by_section(self, text: str) -> List[str]:
@@ -70,7 +94,7 @@ class AdvancedIPCExtractor:
         
         # Split by common section patterns
         # Matches patterns like: "Section 420", "420.", etc.
-        chunks = re.split(r'\n(?=\d+[A-Z]?\.|\bSection\s+\d+[A-Z]?\b)', text)
+        chunks = _SECTION_SPLIT_RE.split(text)
         
         # Filter empty chunks
         chunks = [chunk.strip() for chunk in chunks if chunk.strip() and len(chunk.strip()) > 20]
@@ -80,35 +104,19 @@ class AdvancedIPCExtractor:
     
     def parse_section_regex(self, chunk: str) -> Optional[Dict]:
         """Parse section using regex patterns"""
+        chunk = chunk.strip()
         
         # Try multiple patterns
-        patterns = [
-            # Pattern 1: "Section 420. Title.—Text"
-            r'^(?:Section\s+)?(\d+[A-Z]?)\.\s*([^.—\-–]+?)\.?\s*[—\-–]\s*(.*)',
-            # Pattern 2: "420. Title—Text"
-            r'^(\d+[A-Z]?)\.\s*([^.—\-–]+?)\s*[—\-–]\s*(.*)',
-            # Pattern 3: "Section 420: Title - Text"
-            r'^(?:Section\s+)?(\d+[A-Z]?)[:\.]\s*([^:—\-–]+?)\s*[:\-–—]\s*(.*)',
-        ]
-        
-        for pattern in patterns:
-            match = re.match(pattern, chunk.strip(), re.DOTALL | re.IGNORECASE)
+        for pattern in _SECTION_PATTERNS:
+            match = pattern.match(chunk)
             if match:
                 section_num = match.group(1).strip()
-                title = match.group(2).strip()
-                text = match.group(3).strip()
-                
-                # Clean up text
-                text = re.sub(r'\s+', ' ', text)
-                title = re.sub(r'\s+', ' ', title)
+                title = collapse_whitespace(match.group(2))
+                text = collapse_whitespace(match.group(3))
                 
                 # Extract punishment if mentioned
                 punishment = None
-                punishment_match = re.search(
-                    r'(?:shall be punished|punishment|imprisonment|fine).*?(?:\.|$)',
-                    text,
-                    re.IGNORECASE
-                )
+                punishment_match = _PUNISHMENT_RE.search(text)
                 if punishment_match:
                     punishment = punishment_match.group(0)
                 
@@ -123,26 +131,18 @@ class AdvancedIPCExtractor:
         
         return None
     
-    def parse_section_llm(self, chunk: str) -> Optional[Dict]:
-        """Parse section using LLM for better accuracy"""
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert at extracting structured information from Indian legal documents.
-Extract the section number, title, and complete text from the given IPC section.
-
-{format_instructions}
-
-Only extract if this appears to be a valid IPC section. If not, return null."""),
-            ("human", "{text}")
-        ])
-        
+    def _build_llm_messages(self, chunk: str):
+        """Format the extraction prompt for one chunk"""
+        return self.prompt.format_messages(
+            text=chunk[:2000],  # Limit to avoid token issues
+            format_instructions=self.format_instructions
+        )
+    
+    def _parse_llm_response(self, response) -> Optional[Dict]:
+        """Parse an LLM response (or the exception raised instead) into a section"""
         try:
-            messages = prompt.format_messages(
-                text=chunk[:2000],  # Limit to avoid token issues
-                format_instructions=self.parser.get_format_instructions()
-            )
-            
-            response = self.llm.invoke(messages)
+            if isinstance(response, Exception):
+                raise response
             parsed = self.parser.parse(response.content)
             
             return parsed.dict()
@@ -151,26 +151,50 @@ Only extract if this appears to be a valid IPC section. If not, return null.""")
             print(f"⚠️  LLM parsing failed for chunk: {str(e)[:100]}")
             return None
     
+    def parse_section_llm(self, chunk: str) -> Optional[Dict]:
+        """Parse section using LLM for better accuracy"""
+        return self.parse_sections_llm([chunk])[0]
+    
+    def parse_sections_llm(self, chunks: List[str]) -> List[Optional[Dict]]:
+        """Parse several chunks with concurrent LLM requests, keeping their order"""
+        responses = self.llm.batch(
+            [self._build_llm_messages(chunk) for chunk in chunks],
+            config={"max_concurrency": LLM_MAX_CONCURRENCY},
+            return_exceptions=True
+        )
+        return [self._parse_llm_response(response) for response in responses]
+    
     def extract_sections(self, text: str) -> List[Dict]:
         """Extract all sections from text"""
         print("\n🔍 Extracting IPC sections...")
         
         chunks = self.chunk_text_by_section(text)
-        sections = []
+        
+        # Repeated headers/footers produce identical chunks; parse each once
+        unique_chunks = list(dict.fromkeys(chunks))
+        if len(unique_chunks) < len(chunks):
+            print(f"♻️  Skipping {len(chunks) - len(unique_chunks)} duplicate chunks")
+        chunks = unique_chunks
+        
+        sections: List[Optional[Dict]] = []
         
         for i, chunk in enumerate(chunks, 1):
             if i % 50 == 0:
                 print(f"Processing chunk {i}/{len(chunks)}...")
             
             # Try regex first (faster)
-            section = self.parse_section_regex(chunk)
-            
-            # If regex fails and LLM is enabled, try LLM
-            if not section and self.use_llm:
-                section = self.parse_section_llm(chunk)
-            
-            if section:
-                sections.append(section)
+            sections.append(self.parse_section_regex(chunk))
+        
+        # Chunks the regex could not parse go to the LLM together
+        if self.use_llm:
+            missing = [i for i, section in enumerate(sections) if not section]
+            if missing:
+                print(f"🤖 Parsing {len(missing)} chunks with LLM...")
+                parsed = self.parse_sections_llm([chunks[i] for i in missing])
+                for i, section in zip(missing, parsed):
+                    sections[i] = section
+        
+        sections = [section for section in sections if section]
         
         print(f"✅ Extracted {len(sections)} valid sections")
         return sections
@@ -182,15 +206,35 @@ Only extract if this appears to be a valid IPC section. If not, return null.""")
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(sections, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            output_path.write_bytes(orjson.dumps(sections, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(sections, f, ensure_ascii=False, indent=2)
         
         print(f"✅ Saved {len(sections)} sections")
     
+    def _cache_file(self, output_path: str) -> Path:
+        """Cache path keyed by a hash of the PDF bytes and the parser mode"""
+        digest = hashlib.blake2b(Path(self.pdf_path).read_bytes(), digest_size=8)
+        digest.update(b"llm" if self.use_llm else b"regex")
+        output_path = Path(output_path)
+        return output_path.parent / ".extract_cache" / f"{output_path.stem}.{digest.hexdigest()}.json"
+    
     def run(self, output_path: str) -> List[Dict]:
         """Run complete extraction pipeline"""
         print("🚀 Starting advanced IPC extraction...\n")
         
+        # Results are cached per PDF content (and parser mode), so re-running
+        # on an unchanged PDF skips extraction entirely
+        cache_file = self._cache_file(output_path)
+        if cache_file.exists():
+            print(f"♻️  PDF unchanged, reusing {cache_file}")
+            data = cache_file.read_bytes()
+            sections = orjson.loads(data) if orjson is not None else json.loads(data)
+            self.save_to_json(sections, output_path)
+            return sections
+        
         # Extract text
         text = self.extract_text_from_pdf()
         
@@ -200,6 +244,7 @@ Only extract if this appears to be a valid IPC section. If not, return null.""")
         # Save results
         if sections:
             self.save_to_json(sections, output_path)
+            self.save_to_json(sections, str(cache_file))
             
             # Print statistics
             print("\n📊 Extraction Statistics:")
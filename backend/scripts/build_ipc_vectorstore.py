@@ -3,32 +3,68 @@ RAG Integration for IPC Sections
 Creates vector embeddings and integrates with FAISS vector store
 """
 
+import asyncio
+import hashlib
 import json
+import math
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+import faiss
+import numpy as np
 from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings
 
 # Load environment variables
 load_dotenv()
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class IPCVectorStore:
     """Manage vector store for IPC sections"""
     
-    def __init__(self, embeddings_model: str = "text-embedding-3-small"):
-        self.embeddings = OpenAIEmbeddings(model=embeddings_model)
+    def __init__(self, embeddings_model: str = "text-embedding-3-small", local_embeddings: bool = False,
+                 cache_dir: str = None):
+        if local_embeddings:
+            # Runs on CPU with no API calls; the backend must then be started
+            # with EMBEDDING_PROVIDER=local so queries use the same model
+            from langchain_huggingface import HuggingFaceEmbeddings
+            self.model_name = os.getenv("LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+            embeddings = HuggingFaceEmbeddings(
+                model_name=self.model_name,
+                encode_kwargs={"batch_size": 128, "normalize_embeddings": True}
+            )
+        else:
+            self.model_name = embeddings_model
+            embeddings = OpenAIEmbeddings(model=embeddings_model)
+        
+        # Document vectors are cached on disk by text hash (per model), so a
+        # rebuild only embeds sections that changed
+        cache_dir = cache_dir or Path(__file__).parent.parent / "data" / ".embed_cache"
+        self.embeddings = CacheBackedEmbeddings.from_bytes_store(
+            embeddings, LocalFileStore(str(cache_dir)), namespace=self.model_name
+        )
         self.vector_store = None
     
     def load_sections_from_json(self, json_path: str) -> List[Dict]:
         """Load IPC sections from JSON file"""
         print(f"📖 Loading sections from {json_path}...")
         
-        with open(json_path, 'r', encoding='utf-8') as f:
-            sections = json.load(f)
+        data = Path(json_path).read_bytes()
+        sections = orjson.loads(data) if orjson is not None else json.loads(data)
         
         print(f"✅ Loaded {len(sections)} sections")
         return sections
@@ -37,39 +73,35 @@ class IPCVectorStore:
         """Convert legal sections to LangChain documents"""
         print(f"\n📄 Creating {law_name} documents...")
         
-        documents = []
-        
-        for section in sections:
-            # Create comprehensive content
-            content = f"""Section {section['section']}: {section['title']}
-
-{section['text']}"""
-            
-            # Add punishment if available
-            if section.get('punishment'):
-                content += f"\n\nPunishment: {section['punishment']}"
-            
-            # Create metadata
-            metadata = {
-                "jurisdiction": section.get("jurisdiction", "India"),
-                "law": law_name,
-                "section": section["section"],
-                "title": section["title"],
-                "source": f"{law_name} Section {section['section']}"
-            }
-            
-            if section.get("chapter"):
-                metadata["chapter"] = section["chapter"]
-            
-            doc = Document(
-                page_content=content,
-                metadata=metadata
-            )
-            documents.append(doc)
+        documents = [self._section_document(section, law_name) for section in sections]
         
         print(f"✅ Created {len(documents)} documents")
         return documents
     
+    @staticmethod
+    def _section_document(section: Dict, law_name: str) -> Document:
+        """One document per section: header, text and punishment if any"""
+        number = section["section"]
+        title = section["title"]
+        content = "Section %s: %s\n\n%s" % (number, title, section["text"])
+        
+        punishment = section.get("punishment")
+        if punishment:
+            content = "%s\n\nPunishment: %s" % (content, punishment)
+        
+        metadata = {
+            "jurisdiction": section.get("jurisdiction", "India"),
+            "law": law_name,
+            "section": number,
+            "title": title,
+            "source": f"{law_name} Section {number}"
+        }
+        chapter = section.get("chapter")
+        if chapter:
+            metadata["chapter"] = chapter
+        
+        return Document(page_content=content, metadata=metadata)
+    
     def split_documents(self, documents: List[Document], chunk_size: int = 1000, 
                        chunk_overlap: int = 200) -> List[Document]:
         """Split documents into smaller chunks if needed"""
@@ -86,26 +118,86 @@ class IPCVectorStore:
         print(f"✅ Created {len(split_docs)} chunks from {len(documents)} documents")
         return split_docs
     
-    def create_vector_store(self, documents: List[Document]) -> FAISS:
-        """Create FAISS vector store from documents"""
-        print("\n🔢 Creating vector embeddings...")
-        print("   This may take a few minutes...")
+    @staticmethod
+    def build_index(vectors: np.ndarray, index_type: str = "flat") -> faiss.Index:
+        """Build an inner-product index over unit vectors.
+        
+        ``flat`` is exact, ``hnsw`` searches in roughly log time without
+        training, ``ivf`` clusters the vectors and probes the nearest lists,
+        ``ivfpq`` additionally compresses each vector to ``m`` bytes.
+        """
+        dim = vectors.shape[1]
+        if index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 200
+            index.hnsw.efSearch = 64
+        elif index_type == "ivf":
+            nlist = max(1, int(4 * math.sqrt(len(vectors))))
+            index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            index.nprobe = 10
+        elif index_type == "ivfpq":
+            # 8-bit codes need 256 training points per sub-quantizer (faiss
+            # recommends ~10k); m must divide the dimension
+            if len(vectors) < 256:
+                raise ValueError(f"ivfpq needs at least 256 vectors, got {len(vectors)}")
+            if len(vectors) < 256 * 39:
+                print(f"⚠️  Only {len(vectors)} vectors to train PQ; recall may suffer")
+            m = next(m for m in range(min(96, dim), 0, -1) if dim % m == 0)
+            nlist = min(256, max(1, len(vectors) // 39))
+            index = faiss.IndexIVFPQ(faiss.IndexFlatIP(dim), dim, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            index.nprobe = 16
+        elif index_type == "flat":
+            index = faiss.IndexFlatIP(dim)
+        else:
+            raise ValueError(f"Unknown index type: {index_type}")
         
-        # Create embeddings in batches
-        batch_size = 100
-        all_embeddings = []
+        index.add(vectors)
+        return index
+    
+    def build_documents(self, json_path: str, law_name: str, split_chunks: bool = False,
+                        chunk_size: int = 1000) -> List[Document]:
+        """Load one law's sections and turn them into (optionally split) documents"""
+        sections = self.load_sections_from_json(json_path)
+        documents = self.create_documents(sections, law_name=law_name)
         
-        for i in range(0, len(documents), batch_size):
-            batch = documents[i:i + batch_size]
-            print(f"   Processing batch {i//batch_size + 1}/{(len(documents)-1)//batch_size + 1}...")
+        if split_chunks:
+            documents = self.split_documents(documents, chunk_size=chunk_size)
+        return documents
+    
+    async def aembed_document_groups(self, groups: List[List[Document]]) -> np.ndarray:
+        """Embed several document lists concurrently, stacked in the given order"""
+        vectors = await asyncio.gather(*(
+            self.embeddings.aembed_documents([doc.page_content for doc in documents])
+            for documents in groups
+        ))
+        return np.asarray([vector for group in vectors for vector in group], dtype=np.float32)
+    
+    def create_vector_store(self, documents: List[Document], index_type: str = "flat",
+                            vectors: Optional[np.ndarray] = None) -> FAISS:
+        """Create FAISS vector store from documents (and their embeddings, if already computed)"""
+        if vectors is None:
+            print("\n🔢 Creating vector embeddings...")
+            print("   This may take a few minutes...")
             
-            if i == 0:
-                # Create initial vector store
-                self.vector_store = FAISS.from_documents(batch, self.embeddings)
-            else:
-                # Add to existing vector store
-                batch_store = FAISS.from_documents(batch, self.embeddings)
-                self.vector_store.merge_from(batch_store)
+            # One call: the embedder already batches and retries requests internally
+            texts = [doc.page_content for doc in documents]
+            vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        
+        # Unit-length vectors so inner product is cosine similarity; normalized
+        # once here rather than through LangChain's normalize_L2
+        faiss.normalize_L2(vectors)
+        index = self.build_index(vectors, index_type)
+        
+        ids = [str(uuid.uuid4()) for _ in documents]
+        self.vector_store = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(dict(zip(ids, documents))),
+            index_to_docstore_id=dict(enumerate(ids)),
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
         
         print(f"✅ Vector store created with {len(documents)} documents")
         return self.vector_store
@@ -130,6 +222,8 @@ class IPCVectorStore:
             self.embeddings,
             allow_dangerous_deserialization=True
         )
+        if self.vector_store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            self.vector_store.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
         
         print(f"✅ Vector store loaded")
         return self.vector_store
@@ -150,11 +244,32 @@ class IPCVectorStore:
         results = self.vector_store.similarity_search_with_score(query, k=k)
         return results
     
+    def _source_hash(self, json_paths: List[str], *options) -> str:
+        """Hash of the section JSON files plus everything else that shapes the index"""
+        digest = hashlib.blake2b(digest_size=16)
+        for json_path in json_paths:
+            digest.update(Path(json_path).read_bytes())
+        digest.update("|".join(map(str, (self.model_name, *options))).encode("utf-8"))
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _is_current(save_path: str, source_hash: str) -> bool:
+        """Whether the store at save_path was built from sources with this hash"""
+        hash_file = Path(save_path) / "source.hash"
+        return hash_file.exists() and hash_file.read_text().strip() == source_hash
+    
     def build_from_json(self, json_path: str, save_path: str, 
                        split_chunks: bool = False, chunk_size: int = 1000):
         """Complete pipeline: JSON -> Vector Store"""
         print("🚀 Building IPC vector store from JSON...\n")
         
+        # Skip the rebuild (and its embedding calls) when the same JSON was
+        # already indexed with the same options and embedding model
+        source_hash = self._source_hash([json_path], split_chunks, chunk_size)
+        if self._is_current(save_path, source_hash):
+            print("♻️  Sections unchanged since the last build, loading existing vector store")
+            return self.load_vector_store(save_path)
+        
         # Load sections
         sections = self.load_sections_from_json(json_path)
         
@@ -170,6 +285,7 @@ class IPCVectorStore:
         
         # Save vector store
         self.save_vector_store(save_path)
+        (Path(save_path) / "source.hash").write_text(source_hash)
         
         print("\n✨ Vector store build complete!")
         return self.vector_store
@@ -183,6 +299,12 @@ def main():
     parser.add_argument("--split", action="store_true", help="Split documents into chunks")
     parser.add_argument("--chunk-size", type=int, default=1000, help="Chunk size for splitting")
     parser.add_argument("--test-query", type=str, help="Test query to run after building")
+    parser.add_argument("--index-type", choices=["flat", "hnsw", "ivf", "ivfpq"], default="flat",
+                        help="FAISS index: exact flat, HNSW graph, IVF clusters or IVF-PQ compressed")
+    parser.add_argument("--local-embed", action="store_true",
+                        default=os.getenv("EMBEDDING_PROVIDER") == "local",
+                        help="Embed with a local sentence-transformers model instead of OpenAI "
+                             "(requires langchain-huggingface; serve with EMBEDDING_PROVIDER=local)")
     args = parser.parse_args()
     
     # Paths
@@ -192,42 +314,49 @@ def main():
     
     print("🚀 Building combined IPC + CrPC vector store...\n")
     
-    # Build IPC vector store
-    print("=" * 60)
-    print("📚 Processing IPC (Indian Penal Code)")
-    print("=" * 60)
-    rag = IPCVectorStore()
-    ipc_sections = rag.load_sections_from_json(str(ipc_json_path))
-    ipc_documents = rag.create_documents(ipc_sections, law_name="IPC")
-    
-    if args.split:
-        ipc_documents = rag.split_documents(ipc_documents, chunk_size=args.chunk_size)
-    
-    # Build CrPC vector store
-    print("\n" + "=" * 60)
-    print("📚 Processing CrPC (Code of Criminal Procedure)")
-    print("=" * 60)
-    crpc_sections = rag.load_sections_from_json(str(crpc_json_path))
-    crpc_documents = rag.create_documents(crpc_sections, law_name="CrPC")
-    
-    if args.split:
-        crpc_documents = rag.split_documents(crpc_documents, chunk_size=args.chunk_size)
-    
-    # Combine all documents
-    print("\n" + "=" * 60)
-    print("🔗 Combining IPC + CrPC documents")
-    print("=" * 60)
-    all_documents = ipc_documents + crpc_documents
-    print(f"📊 Total documents: {len(all_documents)} (IPC: {len(ipc_documents)}, CrPC: {len(crpc_documents)})")
-    
-    # Create combined vector store
-    print("\n" + "=" * 60)
-    print("🔢 Creating combined vector store")
-    print("=" * 60)
-    rag.create_vector_store(all_documents)
-    
-    # Save combined vector store
-    rag.save_vector_store(str(combined_vector_store_path))
+    rag = IPCVectorStore(local_embeddings=args.local_embed)
+    
+    # start.sh runs this on every startup: skip the rebuild (and its embedding
+    # calls) when the same JSON was already indexed with the same options
+    source_hash = rag._source_hash(
+        [str(ipc_json_path), str(crpc_json_path)], args.split, args.chunk_size, args.index_type
+    )
+    if rag._is_current(str(combined_vector_store_path), source_hash):
+        print("♻️  Sections unchanged since the last build, loading existing vector store")
+        rag.load_vector_store(str(combined_vector_store_path))
+    else:
+        # IPC and CrPC are independent, so load and split them concurrently
+        print("=" * 60)
+        print("📚 Processing IPC (Indian Penal Code) and CrPC (Code of Criminal Procedure)")
+        print("=" * 60)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            ipc_future = executor.submit(
+                rag.build_documents, str(ipc_json_path), "IPC", args.split, args.chunk_size
+            )
+            crpc_future = executor.submit(
+                rag.build_documents, str(crpc_json_path), "CrPC", args.split, args.chunk_size
+            )
+            ipc_documents = ipc_future.result()
+            crpc_documents = crpc_future.result()
+        
+        # Combine all documents
+        print("\n" + "=" * 60)
+        print("🔗 Combining IPC + CrPC documents")
+        print("=" * 60)
+        all_documents = ipc_documents + crpc_documents
+        print(f"📊 Total documents: {len(all_documents)} (IPC: {len(ipc_documents)}, CrPC: {len(crpc_documents)})")
+        
+        # Embed IPC and CrPC as concurrent requests instead of one after the other
+        print("\n" + "=" * 60)
+        print("🔢 Creating combined vector store")
+        print("=" * 60)
+        print("   Embedding IPC and CrPC concurrently, this may take a few minutes...")
+        vectors = asyncio.run(rag.aembed_document_groups([ipc_documents, crpc_documents]))
+        rag.create_vector_store(all_documents, index_type=args.index_type, vectors=vectors)
+        
+        # Save combined vector store
+        rag.save_vector_store(str(combined_vector_store_path))
+        (combined_vector_store_path / "source.hash").write_text(source_hash)
     
     # Test query
     if args.test_query:
@@ -2,7 +2,7 @@
 Script to build FAISS vector stores from NDA clause libraries
 This creates production-ready RAG systems for both mutual and unilateral NDA clause retrieval
 """
-import json
+import asyncio
 import sys
 from pathlib import Path
 import argparse
@@ -11,9 +11,54 @@ import argparse
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
+from langchain_core.documents import Document
+from app.core.utils import json_loads
 from app.services.vector_store import VectorStoreService
 
 
+def _clause_content(clause: dict) -> str:
+    """Text to embed: title, clause text and any variants (or legacy alternatives)"""
+    # IDs, category, tags and other structured fields live in metadata and
+    # would only add tokens
+    content = f"Title: {clause['title']}\n\nClause Text: {clause['clause_text']}"
+    
+    variants = clause.get('variants')
+    if variants:
+        content += "".join(f"\n\n- {variant['style']}: {variant['text']}" for variant in variants)
+    else:
+        # Old schema - for backwards compatibility
+        alternatives = clause.get('alternatives')
+        if alternatives:
+            content += "".join(f"\n\nAlternative {i}: {alt}" for i, alt in enumerate(alternatives, 1))
+    return content
+
+
+def _clause_metadata(clause: dict, nda_type: str) -> dict:
+    """Structured clause fields used for filtering and display"""
+    metadata = {
+        "clause_id": clause['clause_id'],
+        "clause_type": clause.get('clause_type', 'Unknown'),
+        "category": clause['category'],
+        "title": clause['title'],
+        "legal_intent": clause.get('legal_intent', ''),
+        "is_mandatory": clause.get('is_mandatory', False),
+        "jurisdiction": clause['jurisdiction'],
+        "practice_area": clause['practice_area'],
+        "risk_level": clause['risk_level'],
+        "tags": ", ".join(clause['tags']),
+        "law": "NDA",
+        "nda_type": nda_type,
+        "type": "clause"
+    }
+    
+    # Add optional metadata
+    if clause.get('related_clauses'):
+        metadata['related_clauses'] = ", ".join(clause['related_clauses'])
+    if clause.get('negotiation_notes'):
+        metadata['negotiation_notes'] = clause['negotiation_notes']
+    return metadata
+
+
 def build_nda_vector_store(nda_type="mutual"):
     """Build vector store from NDA clauses
     
@@ -49,85 +94,27 @@ def build_nda_vector_store(nda_type="mutual"):
     nda_path = backend_dir / "data" / "nda" / nda_file
     print(f"\nLoading {title} clauses from: {nda_path}")
     
-    with open(nda_path, 'r', encoding='utf-8') as f:
-        nda_clauses = json.load(f)
+    nda_clauses = json_loads(nda_path.read_bytes())
     
     print(f"Loaded {len(nda_clauses)} {title} clauses")
     
     # Create documents with enhanced metadata
     print("\nCreating documents with metadata...")
+    # Categories are counted in the same pass for the summary below
     documents = []
-    
+    categories = set()
     for clause in nda_clauses:
-        # Create rich text content for embedding
-        content_parts = [
-            f"Clause ID: {clause['clause_id']}",
-            f"Type: {clause.get('clause_type', 'N/A')}",
-            f"Category: {clause['category']}",
-            f"Title: {clause['title']}",
-            f"Legal Intent: {clause.get('legal_intent', 'N/A')}",
-            f"Mandatory: {clause.get('is_mandatory', False)}",
-            f"Clause Text: {clause['clause_text']}",
-        ]
-        
-        # Add variants if present (new schema)
-        if clause.get('variants'):
-            content_parts.append(f"Variants: {len(clause['variants'])}")
-            for variant in clause['variants']:
-                content_parts.append(f"- {variant['style']}: {variant['text']}")
-        
-        # Add alternatives if present (old schema - for backwards compatibility)
-        elif clause.get('alternatives'):
-            content_parts.append(f"Alternative Versions: {len(clause['alternatives'])}")
-            for i, alt in enumerate(clause['alternatives'], 1):
-                content_parts.append(f"Alternative {i}: {alt}")
-        
-        # Add metadata fields
-        if clause.get('negotiation_notes'):
-            content_parts.append(f"Negotiation Notes: {clause['negotiation_notes']}")
-        
-        if clause.get('tags'):
-            content_parts.append(f"Tags: {', '.join(clause['tags'])}")
-        
-        content = "\n\n".join(content_parts)
-        
-        # Create metadata
-        metadata = {
-            "clause_id": clause['clause_id'],
-            "clause_type": clause.get('clause_type', 'Unknown'),
-            "category": clause['category'],
-            "title": clause['title'],
-            "legal_intent": clause.get('legal_intent', ''),
-            "is_mandatory": clause.get('is_mandatory', False),
-            "jurisdiction": clause['jurisdiction'],
-            "practice_area": clause['practice_area'],
-            "risk_level": clause['risk_level'],
-            "tags": ", ".join(clause['tags']),
-            "law": "NDA",
-            "nda_type": nda_metadata,
-            "type": "clause"
-        }
-        
-        # Add optional metadata
-        if clause.get('related_clauses'):
-            metadata['related_clauses'] = ", ".join(clause['related_clauses'])
-        
-        documents.append({
-            "page_content": content,
-            "metadata": metadata
-        })
+        documents.append(Document(page_content=_clause_content(clause), metadata=_clause_metadata(clause, nda_metadata)))
+        categories.add(clause['category'])
     
     print(f"Created {len(documents)} documents")
     
-    # Convert to Document objects
-    from langchain_core.documents import Document
-    doc_objects = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in documents]
-    
     # Create vector store
     output_dir = backend_dir / "data" / "nda" / vector_store_dir
     print(f"\nCreating vector store at: {output_dir}")
     
-    vectorstore = vector_service.create_vector_store(doc_objects)
+    # Embedding batches are sent concurrently (EMBED_CONCURRENCY in flight)
+    vectorstore = asyncio.run(vector_service.acreate_vector_store(documents))
     
     # Save vector store
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -136,7 +123,7 @@ def build_nda_vector_store(nda_type="mutual"):
     print(f"\n✅ Vector store saved successfully!")
     print(f"   - Location: {output_dir}")
     print(f"   - Documents: {len(documents)}")
-    print(f"   - Categories: {len(set(c['category'] for c in nda_clauses))}")
+    print(f"   - Categories: {len(categories)}")
     print("=" * 80)
     
     # Test the vector store
@@ -160,9 +147,9 @@ def build_nda_vector_store(nda_type="mutual"):
             "export control requirements"
         ]
     
-    for query in test_queries:
+    # One embedding request and one FAISS search for all queries
+    for query, results in zip(test_queries, vector_service.similarity_search_batch(test_queries, k=2)):
         print(f"\nQuery: '{query}'")
-        results = vectorstore.similarity_search(query, k=2)
         for i, doc in enumerate(results, 1):
             print(f"  {i}. {doc.metadata.get('clause_id', 'N/A')} - {doc.metadata.get('title', 'N/A')}")
             print(f"     Category: {doc.metadata.get('category', 'N/A')} | Risk: {doc.metadata.get('risk_level', 'N/A')}")
@@ -6,8 +6,23 @@ Extracts sections from IPC PDF and normalizes them into structured JSON format
 import re
 import json
 from pathlib import Path
-from typing import List, Dict
-import PyPDF2
+from typing import Dict, Iterable, Iterator, List
+from pdf_text import collapse_whitespace, iter_pdf_pages
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# "Section 420. Title.—Description text" or "420. Title.—Description text"
+_SECTION_RE = re.compile(
+    r'(?:Section\s+)?(\d+[A-Z]?)\.\s*([^.—]+?)\.?[—\-–]\s*(.*?)(?=(?:Section\s+)?\d+[A-Z]?\.|$)',
+    re.DOTALL | re.IGNORECASE
+)
+# Section header line: "420." or "Section 420."
+_HEADER_RE = re.compile(r'^(?:Section\s+)?(\d+[A-Z]?)\.\s*(.+)$')
+# Trailing dots or dashes after a title
+_TRAILING_PUNCT_RE = re.compile(r'[.—\-–]+$')
 
 
 class IPCExtractor:
@@ -18,26 +33,31 @@ class IPCExtractor:
         self.jurisdiction = "India"
         self.law = "IPC"
         
-    def extract_text_from_pdf(self) -> str:
-        """Extract raw text from PDF"""
-        print(f"📖 Extracting text from {self.pdf_path}...")
-        
-        text = ""
+    def _iter_pages(self) -> Iterator[str]:
+        """Yield the text of each PDF page in order"""
         try:
-            with open(self.pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                print(f"Total pages: {total_pages}")
-                
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    if page_num % 10 == 0:
-                        print(f"Processing page {page_num}/{total_pages}...")
-                    text += page.extract_text()
-                    
+            yield from iter_pdf_pages(self.pdf_path)
         except Exception as e:
             print(f"❌ Error extracting PDF: {e}")
             raise
-            
+    
+    @staticmethod
+    def _iter_lines(pages: Iterable[str]) -> Iterator[str]:
+        """Split concatenated pages into lines without building the full text"""
+        # Pages are joined without a separator, so the last partial line of a
+        # page continues on the next one
+        carry = ""
+        for page in pages:
+            lines = (carry + page).split('\n')
+            carry = lines.pop()
+            yield from lines
+        yield carry
+    
+    def extract_text_from_pdf(self) -> str:
+        """Extract raw text from PDF"""
+        print(f"📖 Extracting text from {self.pdf_path}...")
+        
+        text = "".join(self._iter_pages())
         print(f"✅ Extracted {len(text)} characters")
         return text
     
@@ -47,21 +67,10 @@ class IPCExtractor:
         
         sections = []
         
-        # Pattern to match IPC sections
-        # Matches: "Section 420. Title.—Description text"
-        # or "420. Title.—Description text"
-        section_pattern = r'(?:Section\s+)?(\d+[A-Z]?)\.\s*([^.—]+?)\.?[—\-–]\s*(.*?)(?=(?:Section\s+)?\d+[A-Z]?\.|$)'
-        
-        matches = re.finditer(section_pattern, text, re.DOTALL | re.IGNORECASE)
-        
-        for match in matches:
+        for match in _SECTION_RE.finditer(text):
             section_num = match.group(1).strip()
             title = match.group(2).strip()
-            section_text = match.group(3).strip()
-            
-            # Clean up text
-            section_text = re.sub(r'\s+', ' ', section_text)
-            section_text = re.sub(r'\n+', ' ', section_text)
+            section_text = collapse_whitespace(match.group(3))
             
             if section_text and len(section_text) > 10:  # Basic validation
                 sections.append({
@@ -82,66 +91,65 @@ class IPCExtractor:
         """
         print("\n🔍 Parsing IPC sections (alternative method)...")
         
-        sections = []
-        lines = text.split('\n')
+        sections = list(self._iter_sections(text.split('\n')))
         
+        print(f"✅ Found {len(sections)} sections")
+        return sections
+    
+    def _iter_sections(self, lines: Iterable[str]) -> Iterator[Dict]:
+        """Line-by-line section state machine, yielding each section once it is complete"""
         current_section = None
         current_title = None
         current_text = []
         
-        # Pattern for section header: "420." or "Section 420."
-        section_header_pattern = r'^(?:Section\s+)?(\d+[A-Z]?)\.\s*(.+)$'
-        
         for line in lines:
             line = line.strip()
             if not line:
                 continue
             
             # Check if this is a section header
-            match = re.match(section_header_pattern, line)
+            match = _HEADER_RE.match(line)
             
             if match:
-                # Save previous section if exists
+                # Emit previous section if exists
                 if current_section and current_text:
-                    sections.append({
-                        "jurisdiction": self.jurisdiction,
-                        "law": self.law,
-                        "section": current_section,
-                        "title": current_title,
-                        "text": ' '.join(current_text).strip()
-                    })
+                    yield self._section(current_section, current_title, current_text)
                 
                 # Start new section
                 current_section = match.group(1).strip()
                 current_title = match.group(2).strip()
                 
                 # Remove trailing dots or dashes from title
-                current_title = re.sub(r'[.—\-–]+$', '', current_title).strip()
+                current_title = _TRAILING_PUNCT_RE.sub('', current_title).strip()
                 current_text = []
                 
             elif current_section:
                 # Continue collecting text for current section
                 current_text.append(line)
         
-        # Save last section
+        # Emit last section
         if current_section and current_text:
-            sections.append({
-                "jurisdiction": self.jurisdiction,
-                "law": self.law,
-                "section": current_section,
-                "title": current_title,
-                "text": ' '.join(current_text).strip()
-            })
-        
-        print(f"✅ Found {len(sections)} sections")
-        return sections
+            yield self._section(current_section, current_title, current_text)
+    
+    def _section(self, section: str, title: str, lines: List[str]) -> Dict:
+        """Section record from its header and collected lines"""
+        return {
+            "jurisdiction": self.jurisdiction,
+            "law": self.law,
+            "section": section,
+            "title": title,
+            "text": ' '.join(lines).strip()
+        }
     
     def save_to_json(self, sections: List[Dict], output_path: str):
         """Save extracted sections to JSON file"""
         print(f"\n💾 Saving to {output_path}...")
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(sections, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            Path(output_path).write_bytes(orjson.dumps(sections, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(sections, f, ensure_ascii=False, indent=2)
         
         print(f"✅ Saved {len(sections)} sections to JSON")
     
@@ -149,13 +157,15 @@ class IPCExtractor:
         """Complete extraction pipeline"""
         print("🚀 Starting IPC extraction pipeline...\n")
         
-        # Extract text
-        raw_text = self.extract_text_from_pdf()
-        
-        # Parse sections
         if use_alternative:
-            sections = self.parse_sections_alternative(raw_text)
+            # Line-based parsing streams pages straight into the state machine,
+            # so the full text is never held in memory
+            print(f"📖 Extracting and parsing {self.pdf_path} (alternative method)...")
+            sections = list(self._iter_sections(self._iter_lines(self._iter_pages())))
+            print(f"✅ Found {len(sections)} sections")
         else:
+            # The section regex can span lines, so it needs the whole text
+            raw_text = self.extract_text_from_pdf()
             sections = self.parse_sections(raw_text)
         
         # If no sections found with primary method, try alternative
@@ -7,6 +7,12 @@ echo "🚀 Starting LawAI Backend..."
 echo "📦 Building vector stores..."
 python scripts/build_ipc_vectorstore.py
 
-# Start the application
-echo "🌟 Starting uvicorn server..."
-uvicorn app.main:app --host 0.0.0.0 --port ${PORT:-8000}
+# Start the application. Each worker loads its own vector stores and caches,
+# so scale with WEB_CONCURRENCY only as far as memory allows (same default as
+# Settings.WORKERS)
+WORKERS=${WEB_CONCURRENCY:-1}
+echo "🌟 Starting gunicorn with ${WORKERS} uvicorn workers..."
+exec gunicorn app.main:app \
+    -k uvicorn.workers.UvicornWorker \
+    -w ${WORKERS} \
+    --bind 0.0.0.0:${PORT:-8000}
@@ -6,9 +6,14 @@ This script shows how follow-up questions now work correctly with chat history.
 
 import requests
 import json
+from requests.adapters import HTTPAdapter
 
 BASE_URL = "http://localhost:8000"
 
+# One keep-alive connection pool for every request in the run
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
 def test_conversational_flow():
     """Test a conversational flow with follow-up questions"""
     
@@ -25,7 +30,7 @@ def test_conversational_flow():
     question1 = "What are the grounds for divorce under Hindu Marriage Act?"
     print(f"User: {question1}")
     
-    response1 = requests.post(
+    response1 = session.post(
         f"{BASE_URL}/query",
         json={"question": question1, "chat_history": chat_history}
     )
@@ -49,7 +54,7 @@ def test_conversational_flow():
     print(f"User: {question2}")
     print("💡 Expected behavior: Should reformulate to 'What is the punishment for filing false divorce claims' or similar")
     
-    response2 = requests.post(
+    response2 = session.post(
         f"{BASE_URL}/query",
         json={"question": question2, "chat_history": chat_history}
     )
@@ -73,7 +78,7 @@ def test_conversational_flow():
     print(f"User: {question3}")
     print("💡 Expected behavior: Should understand context from previous conversation")
     
-    response3 = requests.post(
+    response3 = session.post(
         f"{BASE_URL}/query",
         json={"question": question3, "chat_history": chat_history}
     )
@@ -95,7 +100,7 @@ def test_conversational_flow():
     chat_history.append({"role": "user", "content": question3})
     chat_history.append({"role": "assistant", "content": answer3})
     
-    response4 = requests.post(
+    response4 = session.post(
         f"{BASE_URL}/query",
         json={"question": question4, "chat_history": chat_history}
     )
@@ -118,7 +123,7 @@ def test_conversational_flow():
     print(f"User: {question5}")
     print("💡 Expected behavior: Should reformulate to 'What are penalties under Section 66 of IT Act'")
     
-    response5 = requests.post(
+    response5 = session.post(
         f"{BASE_URL}/query",
         json={"question": question5, "chat_history": chat_history}
     )
@@ -148,7 +153,7 @@ def test_conversational_flow():
 if __name__ == "__main__":
     # Check if backend is running
     try:
-        health = requests.get(f"{BASE_URL}/")
+        health = session.get(f"{BASE_URL}/")
         if health.status_code == 200:
             print("\n✅ Backend is running!")
             test_conversational_flow()
@@ -1,11 +1,27 @@
 """Vector store management for legal documents"""
 
+import asyncio
 import os
-from typing import List
+import pickle
+import uuid
+from typing import Any, List, Optional, Tuple
+import faiss
+import numpy as np
+import openai
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
 from langchain.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_openai import OpenAIEmbeddings
 from langchain.docstore.document import Document
-from config import VECTOR_STORE_PATH, EMBEDDING_MODEL, OPENAI_API_KEY
+from app.services.faiss_index import build_index
+from app.services.vector_store import FAISS_POOL, search_matrix
+from config import (
+    VECTOR_STORE_PATH, EMBEDDING_MODEL, EMBED_CHUNK_SIZE, EMBED_CACHE_DIR, OPENAI_API_KEY,
+    TOP_K_RESULTS, SEARCH_BATCH_WINDOW_MS, SEARCH_BATCH_MAX_SIZE,
+    HNSW_MIN_VECTORS, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH, USE_QUANTIZATION,
+    MMAP_VECTOR_STORE
+)
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -16,31 +32,83 @@ class VectorStoreManager:
     """Manages vector store operations for legal documents"""
     
     def __init__(self):
-        self.embeddings = OpenAIEmbeddings(
-            model=EMBEDDING_MODEL,
-            openai_api_key=OPENAI_API_KEY
+        # Document vectors are cached on disk by text hash (per model), the same
+        # way the IPC build script caches them, so reloading documents only
+        # embeds new or changed chunks
+        self.embeddings = CacheBackedEmbeddings.from_bytes_store(
+            OpenAIEmbeddings(
+                model=EMBEDDING_MODEL,
+                openai_api_key=OPENAI_API_KEY,
+                chunk_size=EMBED_CHUNK_SIZE
+            ),
+            LocalFileStore(EMBED_CACHE_DIR),
+            namespace=EMBEDDING_MODEL
         )
         self.vector_store = None
     
-    def create_vector_store(self, documents: List[Document]) -> FAISS:
+    def _embed_texts(self, texts: List[str], chunk_size: int) -> List[List[float]]:
+        """Embed texts ``chunk_size`` per request, halving any batch the API rejects as too large"""
+        vectors = []
+        for i in range(0, len(texts), chunk_size):
+            batch = texts[i:i + chunk_size]
+            try:
+                vectors.extend(self.embeddings.embed_documents(batch))
+            except openai.BadRequestError:
+                if len(batch) == 1:
+                    raise
+                logger.warning(f"Embedding batch of {len(batch)} rejected, retrying in halves")
+                vectors.extend(self._embed_texts(batch, (len(batch) + 1) // 2))
+        return vectors
+    
+    def create_vector_store(self, documents: List[Document], embeddings_chunk_size: int = EMBED_CHUNK_SIZE) -> FAISS:
         """Create a new vector store from documents"""
         logger.info(f"Creating vector store with {len(documents)} documents...")
         
-        self.vector_store = FAISS.from_documents(
-            documents=documents,
-            embedding=self.embeddings
+        # Explicit large batches: one HTTP request covers up to chunk_size texts
+        texts = [doc.page_content for doc in documents]
+        vectors = self._embed_texts(texts, min(embeddings_chunk_size, 2048))
+        
+        # Hand FAISS one contiguous float32 matrix instead of a list of lists
+        index = self._build_index(np.ascontiguousarray(vectors, dtype=np.float32))
+        logger.info(f"Using {type(index).__name__} for {len(vectors)} vectors")
+        
+        ids = [str(uuid.uuid4()) for _ in documents]
+        self.vector_store = FAISS(
+            self.embeddings,
+            index,
+            InMemoryDocstore(dict(zip(ids, documents))),
+            dict(enumerate(ids))
         )
         
         logger.info("Vector store created successfully")
         return self.vector_store
     
+    @staticmethod
+    def _build_index(vectors: np.ndarray) -> faiss.Index:
+        """L2 index over the vectors: exact flat, or HNSW and/or 8-bit quantized"""
+        return build_index(
+            vectors,
+            faiss.METRIC_L2,
+            hnsw_min_vectors=HNSW_MIN_VECTORS,
+            hnsw_m=HNSW_M,
+            ef_construction=HNSW_EF_CONSTRUCTION,
+            ef_search=HNSW_EF_SEARCH,
+            quantize=USE_QUANTIZATION
+        )
+    
     def save_vector_store(self, path: str = VECTOR_STORE_PATH):
         """Save vector store to disk"""
         if self.vector_store is None:
             raise ValueError("No vector store to save. Create one first.")
         
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        self.vector_store.save_local(path)
+        # Write aside and swap the files in: a process that has the old index
+        # memory-mapped keeps reading the old inode instead of a truncated file
+        tmp_path = f"{path}.tmp"
+        self.vector_store.save_local(tmp_path)
+        os.makedirs(path, exist_ok=True)
+        for name in ("index.faiss", "index.pkl"):
+            os.replace(os.path.join(tmp_path, name), os.path.join(path, name))
+        os.rmdir(tmp_path)
         logger.info(f"Vector store saved to {path}")
     
     def load_vector_store(self, path: str = VECTOR_STORE_PATH) -> FAISS:
@@ -48,19 +116,39 @@ class VectorStoreManager:
         if not os.path.exists(path):
             raise FileNotFoundError(f"Vector store not found at {path}")
         
-        self.vector_store = FAISS.load_local(
-            path,
-            self.embeddings,
-            allow_dangerous_deserialization=True
-        )
+        if MMAP_VECTOR_STORE:
+            self.vector_store = self._load_mmapped(path)
+        else:
+            self.vector_store = FAISS.load_local(
+                path,
+                self.embeddings,
+                allow_dangerous_deserialization=True
+            )
+        # efSearch is a query-time parameter and is not restored from disk
+        if hasattr(self.vector_store.index, "hnsw"):
+            self.vector_store.index.hnsw.efSearch = HNSW_EF_SEARCH
         logger.info(f"Vector store loaded from {path}")
         return self.vector_store
     
+    def _load_mmapped(self, path: str) -> FAISS:
+        """Same as FAISS.load_local, but the index vectors stay in the page cache"""
+        index = faiss.read_index(
+            os.path.join(path, "index.faiss"),
+            faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+        )
+        with open(os.path.join(path, "index.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        return FAISS(self.embeddings, index, docstore, index_to_docstore_id)
+    
     def add_documents(self, documents: List[Document]):
         """Add more documents to existing vector store"""
         if self.vector_store is None:
             raise ValueError("No vector store loaded. Create or load one first.")
         
+        # A memory-mapped index is read-only; take an in-memory copy first
+        if MMAP_VECTOR_STORE:
+            self.vector_store.index = faiss.deserialize_index(faiss.serialize_index(self.vector_store.index))
+        
         self.vector_store.add_documents(documents)
         logger.info(f"Added {len(documents)} documents to vector store")
     
@@ -79,6 +167,77 @@ class VectorStoreManager:
         return self.vector_store.similarity_search_with_score(query, k=k)
 
 
+class SearchBatcher:
+    """Stacks query vectors arriving within a short window into one FAISS search.
+    
+    ``owner`` is anything exposing a LangChain ``vector_store`` attribute, read
+    at search time so reloaded stores are picked up. FAISS searches a (B, d)
+    matrix far more efficiently than B separate (1, d) calls. With a zero
+    window (the default) each search runs at once.
+    """
+    
+    def __init__(self, owner: Any, window_ms: float = None, max_batch: int = None):
+        self.owner = owner
+        self.window = (SEARCH_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_batch = max_batch or SEARCH_BATCH_MAX_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    async def search(self, vector, k: int = None) -> List[Tuple[str, Document]]:
+        """Queue a search for an embedded query and wait for its ``(docstore_id, document)`` pairs"""
+        k = k or TOP_K_RESULTS
+        if self.window <= 0:
+            loop = asyncio.get_running_loop()
+            return (await loop.run_in_executor(FAISS_POOL, self._search_batch, [vector], k))[0]
+        
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((vector, k, future))
+        return await future
+    
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                results = await loop.run_in_executor(
+                    FAISS_POOL, self._search_batch, [vector for vector, _, _ in batch], max(k for _, k, _ in batch)
+                )
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, k, future), documents in zip(batch, results):
+                if not future.done():
+                    future.set_result(documents[:k])
+    
+    def _search_batch(self, vectors: List, k: int) -> List[List[Tuple[str, Document]]]:
+        store = self.owner.vector_store
+        if store is None:
+            return [[] for _ in vectors]
+        return search_matrix(store, vectors, k, with_ids=True)
+
+
 def initialize_vector_store(force_reload: bool = False):
     """Initialize or load the vector store"""
     manager = VectorStoreManager()